@@ -0,0 +1,139 @@
+"""
+Versioned on-disk store for trained model sets.
+
+Each artifact is a directory `v<version>/` holding `models.joblib` (models,
+encoders and CV metrics) and `manifest.json` (version, content hash, data
+watermark, timestamp and library versions). Directories are written under a
+temporary name and renamed into place, so readers never see partial files.
+A `LATEST` file names the newest published version; other processes poll it
+to notice new artifacts without listing or hashing anything.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import List, Optional, Tuple
+
+import joblib
+import sklearn
+
+# Bump when the layout of the models dict or the feature columns change
+ARTIFACT_SCHEMA = 1
+
+# Runtime-only entries of the models dict, rebuilt after loading
+TRANSIENT_KEYS = {'version', 'compiled'}
+
+MODELS_FILE = "models.joblib"
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "LATEST"
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, root: str, keep: int = 5):
+        self.root = root
+        self.keep = keep
+
+    def _path(self, version: int) -> str:
+        return os.path.join(self.root, f"v{version}")
+
+    def versions(self) -> List[int]:
+        """Saved versions, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in os.listdir(self.root):
+            if name.startswith("v") and name[1:].isdigit():
+                found.append(int(name[1:]))
+        return sorted(found, reverse=True)
+
+    def save(self, models: dict, version: int, watermark: dict) -> dict:
+        """Persist a trained model set and return its manifest."""
+        os.makedirs(self.root, exist_ok=True)
+        final_dir = self._path(version)
+        tmp_dir = os.path.join(self.root, f".tmp-v{version}-{os.getpid()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        payload = {k: v for k, v in models.items() if k not in TRANSIENT_KEYS}
+        models_path = os.path.join(tmp_dir, MODELS_FILE)
+        # Uncompressed so numpy arrays can be memory-mapped on load
+        joblib.dump(payload, models_path, compress=0)
+
+        manifest = {
+            "version": version,
+            "schema": ARTIFACT_SCHEMA,
+            "created_at": time.time(),
+            "sha256": _sha256(models_path),
+            "watermark": watermark,
+            "sklearn_version": sklearn.__version__,
+            "metrics": {k: payload.get(k) for k in ('duration_r2', 'duration_mae', 'grade_r2', 'grade_mae')},
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.rename(tmp_dir, final_dir)
+        self._publish(version)
+        self._prune()
+        return manifest
+
+    def _publish(self, version: int):
+        tmp_path = os.path.join(self.root, f".{LATEST_FILE}-{os.getpid()}")
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, os.path.join(self.root, LATEST_FILE))
+
+    def latest_version(self) -> Optional[int]:
+        """The most recently published version, read from the LATEST pointer."""
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def read_manifest(self, version: int) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._path(version), MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_compatible(self, manifest: dict) -> bool:
+        return (manifest.get("schema") == ARTIFACT_SCHEMA
+                and manifest.get("sklearn_version") == sklearn.__version__)
+
+    def load(self, version: int, verify: bool = True) -> Optional[Tuple[dict, dict]]:
+        manifest = self.read_manifest(version)
+        if manifest is None or not self.is_compatible(manifest):
+            return None
+        models_path = os.path.join(self._path(version), MODELS_FILE)
+        try:
+            if verify and _sha256(models_path) != manifest["sha256"]:
+                print(f"Artifact v{version} failed hash check, skipping")
+                return None
+            models = joblib.load(models_path, mmap_mode="r")
+        except Exception as e:
+            print(f"Artifact v{version} could not be loaded: {e}")
+            return None
+        return models, manifest
+
+    def load_latest(self) -> Optional[Tuple[dict, dict]]:
+        """Newest compatible, intact artifact, or None."""
+        for version in self.versions():
+            loaded = self.load(version)
+            if loaded is not None:
+                return loaded
+        return None
+
+    def _prune(self):
+        for version in self.versions()[self.keep:]:
+            shutil.rmtree(self._path(version), ignore_errors=True)
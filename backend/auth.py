@@ -3,11 +3,17 @@ Authentication utilities for JWT token generation and password hashing.
 """
 from datetime import datetime, timedelta
 from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import multiprocessing
+import threading
+import time
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import mysql.connector
 import os
 
 # Security configuration
@@ -15,6 +21,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 10080  # 7 days
 
+# Password hashing pool: bcrypt runs in worker processes, at most
+# PASSWORD_HASH_WORKERS at once with PASSWORD_HASH_MAX_QUEUE more waiting
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+# Verified JWTs, so repeat requests skip signature verification
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -26,6 +41,182 @@ def get_password_hash(password: str) -> str:
     """Hash a password for storing."""
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so password checks don't occupy
+    the request threadpool. Callers beyond workers + max_queue get a 503.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+                 timeout: float = PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.crashes = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded server process is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Drop a broken pool so the next call starts fresh worker processes."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.crashes += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _take_slot(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        with self._lock:
+            self.in_flight += 1
+
+    def _return_slot(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def _submit(self, fn, *args):
+        """
+        Queue `fn` on the pool under a slot. The slot is returned when the job
+        itself finishes or is cancelled, not when the caller stops waiting, so a
+        timed-out bcrypt call still counts against the worker and queue limits.
+        """
+        self._take_slot()
+        try:
+            executor = self._pool()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died since the last call; retry once on a fresh pool
+                self._discard(executor)
+                executor = self._pool()
+                future = executor.submit(fn, *args)
+        except BaseException:
+            self._return_slot()
+            raise
+        # Also fires when the pool breaks under the job, with BrokenProcessPool as its result
+        future.add_done_callback(self._return_slot)
+        return executor, future
+
+    def _crashed(self, executor: ProcessPoolExecutor) -> HTTPException:
+        self._discard(executor)
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                             detail="Password check failed, try again shortly", headers={"Retry-After": "1"})
+
+    def _run(self, fn, *args):
+        executor, future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Drops the job if it's still queued; a running one keeps its slot until done
+            future.cancel()
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Password check timed out")
+        except BrokenProcessPool:
+            # A worker process was killed (out of memory, most likely)
+            raise self._crashed(executor)
+
+    async def _run_async(self, fn, *args):
+        """Like _run, but awaits the worker instead of blocking a thread on it."""
+        executor, future = self._submit(fn, *args)
+        try:
+            # On timeout wait_for cancels the wrapper, which cancels a still-queued job
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Password check timed out")
+        except BrokenProcessPool:
+            raise self._crashed(executor)
+
+    def warm(self):
+        """Start the worker processes ahead of the first login."""
+        self._pool().submit(int).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(verify_password, plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self._run(get_password_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(verify_password, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(get_password_hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "crashes": self.crashes,
+            }
+
+password_hasher = PasswordHasher()
+
+class TokenCache:
+    """Bounded LRU of verified token -> (user_id, expiry timestamp)."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                user_id, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return user_id
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, user_id: int, expires_at: float):
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+token_cache = TokenCache()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -50,11 +241,12 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
-    """
-    Dependency to get the current user ID from JWT token.
-    Use this in protected routes: current_user_id: int = Depends(get_current_user_id)
-    """
+def user_id_for_token(token: str) -> int:
+    """The user ID in a valid token, from the token cache when possible."""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    
     payload = verify_token(token)
     user_id: int = payload.get("user_id")
     if user_id is None:
@@ -63,4 +255,15 @@ def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # jose has already rejected expired tokens; cache until the token's own expiry
+    token_cache.put(token, user_id, float(payload.get("exp", time.time())))
     return user_id
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """
+    Dependency to get the current user ID from JWT token.
+    Use this in protected routes: current_user_id: int = Depends(get_current_user_id)
+    Async so it runs on the event loop: a sync dependency would take a
+    threadpool slot on every request, async routes included.
+    """
+    return user_id_for_token(token)
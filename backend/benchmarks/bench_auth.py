@@ -0,0 +1,90 @@
+"""
+Login throughput and per-request auth overhead.
+
+- Login: concurrent password checks inline on request threads (the old
+  behaviour) vs. through the PasswordHasher process pool, plus the latency a
+  cheap request sees while the login burst is running.
+- Auth: cost of resolving a bearer token (get_current_user_id) with full JWT verification vs. a cached token.
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth
+    python -m benchmarks.bench_auth --logins 64 --threads 32 --rounds 10
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import numpy as np
+
+import auth
+
+
+def login_burst(check, hashed: str, logins: int, threads: int) -> dict:
+    """Run `logins` checks on a pool of `threads` request threads, probing a cheap task meanwhile."""
+    probe_latencies = []
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(check, "correct horse", hashed) for _ in range(logins)]
+        # A trivial request competing for the same threadpool
+        while not all(f.done() for f in futures):
+            t = time.perf_counter()
+            pool.submit(lambda: None).result()
+            probe_latencies.append(time.perf_counter() - t)
+            time.sleep(0.01)
+        ok = 0
+        for f in futures:
+            try:
+                ok += bool(f.result())
+            except Exception:
+                pass
+        elapsed = time.perf_counter() - start
+    return {
+        "logins_per_s": ok / elapsed,
+        "succeeded": ok,
+        "probe_p50_ms": float(np.percentile(probe_latencies, 50)) * 1000 if probe_latencies else 0.0,
+        "probe_p99_ms": float(np.percentile(probe_latencies, 99)) * 1000 if probe_latencies else 0.0,
+    }
+
+
+def auth_overhead(iterations: int) -> dict:
+    token = auth.create_access_token({"user_id": 1, "email": "bench@example.com"})
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        auth.verify_token(token)
+    uncached = (time.perf_counter() - start) / iterations
+
+    auth.user_id_for_token(token)  # populate
+    start = time.perf_counter()
+    for _ in range(iterations):
+        auth.user_id_for_token(token)
+    cached = (time.perf_counter() - start) / iterations
+    return {"jwt_verify_us": uncached * 1e6, "cached_us": cached * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=40, help='Request threadpool size (Starlette default is 40)')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost factor')
+    parser.add_argument('--auth-iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds=args.rounds)).decode()
+    hasher = auth.PasswordHasher(max_queue=args.logins)
+    hasher.warm()
+
+    print(f"Login burst: {args.logins} logins, {args.threads} request threads, bcrypt cost {args.rounds}")
+    for name, check in (("inline", auth.verify_password), ("process pool", hasher.verify)):
+        r = login_burst(check, hashed, args.logins, args.threads)
+        print(f"  {name:>12}: {r['logins_per_s']:6.1f} logins/s ({r['succeeded']} ok), "
+              f"concurrent request p50 {r['probe_p50_ms']:.2f} ms, p99 {r['probe_p99_ms']:.2f} ms")
+    hasher.shutdown()
+
+    r = auth_overhead(args.auth_iterations)
+    print(f"Auth per request: JWT verify {r['jwt_verify_us']:.1f} us, cached {r['cached_us']:.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Compare estimator backends on the same data: fit time, predict latency,
+serialized size and CV R²/MAE for the duration and grade models.
+
+Each backend is fitted with its default params (or searched with --search).
+Latency is measured the way /predict calls the model, on numpy rows, using
+the compiled evaluator where the backend has one.
+
+Usage (from backend/):
+    python -m benchmarks.bench_backends
+    python -m benchmarks.bench_backends --rows 50000 --backends random_forest hist_gradient_boosting
+    python -m benchmarks.bench_backends --csv tasks.csv --json results.json
+"""
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from estimators import BACKENDS
+from inference import compile_models, predict_with
+from training import MODEL_TARGETS, _cv_metrics, fit_model, prepare_features
+
+SUBJECTS = ['CCINFOM', 'CSSWENG', 'CSARCH2', 'STADVDB', 'GEETHIC', 'LCFILIB', 'MTH101A', 'CSALGCM']
+CATEGORIES = ['Exam', 'Essay', 'Project', 'Lab Report', 'Problem Set']
+
+
+def make_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic history where hours and grades depend on the features, plus noise."""
+    rng = np.random.default_rng(seed)
+    subject = rng.integers(0, len(SUBJECTS), n_rows)
+    category = rng.integers(0, len(CATEGORIES), n_rows)
+    difficulty = rng.integers(1, 6, n_rows)
+    terror = (subject % 3 == 0).astype(np.int8)
+    started = rng.integers(0, 8, n_rows)
+    hours = np.maximum(0.5, difficulty * 1.5 + category * 0.8 + terror * 2 + rng.normal(0, 1.5, n_rows))
+    grade = np.clip(2.0 + started * 0.2 - terror * 0.5 + rng.normal(0, 0.4, n_rows), 0, 4)
+    return pd.DataFrame({
+        'task_id': np.arange(1, n_rows + 1),
+        'subject_code': np.array(SUBJECTS)[subject],
+        'task_category': np.array(CATEGORIES)[category],
+        'difficulty_rating': difficulty,
+        'days_started_before_deadline': started,
+        'actual_hours_spent': hours.round(1),
+        'final_grade_received': (grade * 2).round() / 2,
+        'is_terror_prof': terror,
+    })
+
+
+def latency_us(fn, X, repeats: int) -> dict:
+    fn(X)  # warm up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    return {'p50': float(np.percentile(samples, 50)) * 1e6, 'p99': float(np.percentile(samples, 99)) * 1e6}
+
+
+def run_backend(backend, df: pd.DataFrame, search: bool, repeats: int) -> dict:
+    results = {}
+    for name, (columns, target, _) in MODEL_TARGETS.items():
+        X, y = df[columns], df[target]
+        rows = X.to_numpy(dtype=np.float32)
+        start = time.perf_counter()
+        if search:
+            estimator, _, _ = fit_model(name, X, y, None, backend)
+        else:
+            estimator = backend.make(columns, {c: int(X[c].nunique()) for c in columns}, **backend.default_params)
+            estimator.fit(rows, y)
+        fit_s = time.perf_counter() - start
+        # Same params, refitted per fold
+        metrics = _cv_metrics(clone(estimator), rows, y)
+
+        models = {f'{name}_model': estimator}
+        models['compiled'] = compile_models(models)
+        results[name] = {
+            'fit_s': fit_s,
+            'cv_r2': metrics['r2'],
+            'cv_mae': metrics['mae'],
+            'size_mb': len(pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6,
+            'compiled': name in models['compiled'],
+            'predict_1_us': latency_us(lambda X: predict_with(models, name, X), rows[:1], repeats),
+            'predict_100_us': latency_us(lambda X: predict_with(models, name, X), rows[:100], max(10, repeats // 10)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='Synthetic rows (ignored with --csv)')
+    parser.add_argument('--csv', help='Use a CSV task export (GET /tasks/export?format=csv) instead of synthetic data')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--search', action='store_true', help='Tune each backend with its grid instead of default params')
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else make_frame(args.rows)
+    df = prepare_features(df, {})
+    print(f"{len(df)} rows")
+
+    results = {}
+    print(f"{'backend':<24} {'model':<9} {'fit (s)':>8} {'CV R²':>7} {'CV MAE':>7} {'size (MB)':>10} "
+          f"{'p50 1 row (us)':>15} {'p99':>8} {'p50 100 rows (us)':>18}")
+    for name in args.backends:
+        results[name] = run_backend(BACKENDS[name], df, args.search, args.repeats)
+        for model, r in results[name].items():
+            print(f"{name:<24} {model:<9} {r['fit_s']:>8.2f} {r['cv_r2']:>7.3f} {r['cv_mae']:>7.3f} "
+                  f"{r['size_mb']:>10.2f} {r['predict_1_us']['p50']:>15.0f} {r['predict_1_us']['p99']:>8.0f} "
+                  f"{r['predict_100_us']['p50']:>18.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': len(df), 'search': args.search, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
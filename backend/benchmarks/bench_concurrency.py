@@ -0,0 +1,215 @@
+"""
+Throughput with hundreds of simultaneous clients.
+
+Loads a generated dataset (see bench_e2e.py), trains once, then opens
+--clients concurrent clients against the ASGI app for --seconds each. Every
+client loops over a mix of GET /tasks, GET /subjects, GET /users/me and
+POST /predict as fast as responses come back. Reports requests/s overall,
+p50/p99 per route, and status counts (503s mean a pool or queue gave up).
+
+A local SQLite file answers in microseconds, which hides what a networked
+database costs. --db-latency-ms adds a fixed delay to every statement (on
+both the sync and the async connections) to stand in for the round trip to
+a MySQL server; that wait is what held a threadpool slot per request before
+the routes went async.
+
+Results use bench_e2e's JSON layout, so --compare works against a file from
+another commit:
+
+Usage (from backend/):
+    python -m benchmarks.bench_concurrency --out after.json
+    python -m benchmarks.bench_concurrency --clients 512 1024 --db-latency-ms 5 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+DEFAULT_CLIENTS = [512]
+ROUTES = ['tasks', 'subjects', 'me', 'predict']
+
+
+class _SlowCursor:
+    def __init__(self, cursor, delay: float):
+        self._cursor = cursor
+        self._delay = delay
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, query, params=()):
+        time.sleep(self._delay)
+        return self._cursor.execute(query, params)
+
+
+class _SlowAsyncCursor(_SlowCursor):
+    async def execute(self, query, params=()):
+        await asyncio.sleep(self._delay)
+        return await self._cursor.execute(query, params)
+
+
+class _SlowConnection:
+    def __init__(self, conn, delay: float):
+        self._conn = conn
+        self._delay = delay
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _SlowCursor(self._conn.cursor(*args, **kwargs), self._delay)
+
+
+class _SlowAsyncConnection(_SlowConnection):
+    async def cursor(self, *args, **kwargs):
+        return _SlowAsyncCursor(await self._conn.cursor(*args, **kwargs), self._delay)
+
+
+class LatencyStorage:
+    """Wraps a storage backend so every statement waits `delay` seconds first, like a network hop."""
+
+    def __init__(self, storage, delay: float):
+        self._storage = storage
+        self.delay = delay
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+    def connect(self):
+        return _SlowConnection(self._storage.connect(), self.delay)
+
+    async def connect_async(self):
+        return _SlowAsyncConnection(await self._storage.connect_async(), self.delay)
+
+
+def use_storage(main, storage):
+    """Point the app's pools and feature store at `storage`, keeping their settings."""
+    from db import ConnectionPool
+    from feature_store import FeatureStore
+
+    main.db_pool.dispose()
+    main.db_pool = ConnectionPool(storage.connect, size=main.DB_POOL_SIZE, max_overflow=main.DB_POOL_MAX_OVERFLOW,
+                                  timeout=main.DB_POOL_TIMEOUT, recycle=main.DB_POOL_RECYCLE,
+                                  pre_ping=main.DB_POOL_PRE_PING)
+    extra = {}
+    # Absent before the async routes, so the same script can measure older commits
+    if hasattr(main, 'async_db_pool'):
+        from db import AsyncConnectionPool
+        main.async_db_pool = AsyncConnectionPool(storage.connect_async, size=main.ASYNC_DB_POOL_SIZE,
+                                                 max_overflow=main.ASYNC_DB_POOL_MAX_OVERFLOW,
+                                                 timeout=main.DB_POOL_TIMEOUT, recycle=main.DB_POOL_RECYCLE,
+                                                 pre_ping=main.DB_POOL_PRE_PING)
+        extra['connect_async'] = main.get_async_db_connection
+    main.feature_store = FeatureStore(main.get_db_connection, max_users=main.FEATURE_STORE_MAX_USERS, **extra)
+
+
+async def run_clients(bench, clients: int, seconds: float) -> dict:
+    from benchmarks.bench_e2e import latency_summary
+
+    latencies = {route: [] for route in ROUTES}
+    statuses = {}
+    users = list(bench.user_subjects)
+    deadline = time.perf_counter() + seconds
+
+    def request(client: int, i: int):
+        user_id = users[(client + i) % len(users)]
+        headers = bench.headers(user_id)
+        route = ROUTES[(client + i) % len(ROUTES)]
+        if route == 'tasks':
+            return route, bench.client.get('/tasks', params={'limit': 20}, headers=headers)
+        if route == 'subjects':
+            return route, bench.client.get('/subjects', headers=headers)
+        if route == 'me':
+            return route, bench.client.get('/users/me', headers=headers)
+        subjects = bench.user_subjects[user_id]
+        return route, bench.client.post('/predict', headers=headers, json={
+            'subject': subjects[i % len(subjects)], 'category': 'Technical',
+            'difficulty': 1 + i % 5, 'days_to_deadline': 7, 'days_started_before': i % 3})
+
+    async def client(n: int):
+        i = 0
+        while time.perf_counter() < deadline:
+            route, pending = request(n, i)
+            start = time.perf_counter()
+            response = await pending
+            elapsed = time.perf_counter() - start
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code < 300:
+                latencies[route].append(elapsed)
+            i += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    wall = time.perf_counter() - start
+    ok = sum(len(samples) for samples in latencies.values())
+    return {
+        'clients': clients,
+        'ok_per_s': round(ok / wall, 1),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        **{route: latency_summary(samples, wall) for route, samples in latencies.items() if samples},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clients', type=int, nargs='+', default=DEFAULT_CLIENTS)
+    parser.add_argument('--seconds', type=float, default=15.0, help='Measurement time per client count')
+    parser.add_argument('--db-latency-ms', type=float, default=2.0, help='Added to every SQL statement')
+    parser.add_argument('--out', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-concurrency-")
+    os.environ['ARTIFACT_DIR'] = os.path.join(workdir, 'artifacts')
+    import main as app_main
+    from benchmarks.bench_e2e import Bench, RECORDED_SETTINGS, compare, git_commit, prepare
+
+    data, setup_s = prepare(app_main, args.rows, argparse.Namespace(seed=args.seed), workdir)
+    app_main.train_models()
+    use_storage(app_main, LatencyStorage(app_main.storage, args.db_latency_ms / 1000))
+    print(f"{args.rows} rows, {len(data.users)} users (generated and loaded in {setup_s:.1f}s), "
+          f"{args.db_latency_ms}ms per statement")
+
+    output = {
+        'meta': {
+            **git_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+            'settings': {name: os.getenv(name) for name in RECORDED_SETTINGS},
+            'setup_s': {str(args.rows): round(setup_s, 2)},
+        },
+        'results': [],
+    }
+    loop = asyncio.new_event_loop()
+    bench = Bench(app_main, data, argparse.Namespace(seed=args.seed))
+    try:
+        # Load every user into the feature store and open pooled connections before measuring
+        loop.run_until_complete(run_clients(bench, len(bench.user_subjects), 2.0))
+        for clients in args.clients:
+            metrics = loop.run_until_complete(run_clients(bench, clients, args.seconds))
+            output['results'].append({'rows': args.rows, 'scenario': f'clients_{clients}', 'metrics': metrics})
+            print(f"{clients} clients: {json.dumps(metrics)}")
+        loop.run_until_complete(bench.client.aclose())
+    finally:
+        loop.close()
+        app_main.password_hasher.shutdown()
+        app_main.training_worker.shutdown()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == '__main__':
+    main()
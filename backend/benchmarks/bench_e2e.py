@@ -0,0 +1,363 @@
+"""
+End-to-end benchmarks of the app on generated data (see datagen.py).
+
+Each dataset size gets a fresh database (the embedded SQLite backend, see
+storage.py, with the app's own migrations) and a fresh model state.
+Requests go through the full ASGI app in-process (routing, auth, pooling,
+SQL, models), without a network hop. Sync routes run on the same threadpool
+they get under uvicorn.
+
+Scenarios:
+    train    train_models() wall time: cold (full search) then warm (cached
+             params), with the training ledger's per-phase breakdown
+    predict  POST /predict latency, sequential and under --concurrency
+    tasks    GET /tasks first pages across users, and one user's full
+             cursor walk
+    login    a burst of concurrent POST /login requests
+
+Model settings (MODEL_SEARCH, MODEL_BACKEND, TRAINING_MEMORY_BUDGET_MB, ...)
+come from the environment as usual. At 1M rows an exhaustive grid search
+takes a long time, so MODEL_SEARCH=halving is worth setting there.
+
+SQLite numbers are not MySQL numbers: compare runs against each other, not
+against production.
+
+Results are written as JSON (--out), keyed by rows and scenario, with the
+commit and settings they were measured at. --compare prints the ratio of each
+metric against an earlier results file.
+
+Usage (from backend/):
+    python -m benchmarks.bench_e2e
+    python -m benchmarks.bench_e2e --rows 1000 10000 100000 1000000 --out results.json
+    python -m benchmarks.bench_e2e --scenarios predict tasks --out after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+SCENARIOS = ['train', 'predict', 'tasks', 'login']
+DEFAULT_ROWS = [1000, 10000, 100000]
+# Settings recorded with the results, since they change what is measured
+RECORDED_SETTINGS = ['MODEL_SEARCH', 'MODEL_BACKEND', 'MODEL_SELECTION', 'TRAINING_MEMORY_BUDGET_MB',
+                     'TRAINING_ISOLATION', 'TRAINING_CPUS', 'TRAINING_NICE',
+                     'DB_POOL_SIZE', 'DB_POOL_MAX_OVERFLOW', 'ASYNC_DB_POOL_SIZE', 'ASYNC_DB_POOL_MAX_OVERFLOW',
+                     'PASSWORD_HASH_WORKERS', 'PREDICTION_CACHE_SIZE', 'PREDICTION_CACHE_SECONDS']
+
+_hash_lock = threading.Lock()
+_password_hash = None
+
+
+def latency_summary(samples: list, wall: float) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {
+        'requests': len(samples),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+        'per_s': round(len(samples) / wall, 1) if wall else None,
+    }
+
+
+async def run_load(make_request, total: int, concurrency: int):
+    """Issue `total` requests from `concurrency` workers. Returns (latencies of 2xx responses, statuses, wall)."""
+    latencies, statuses = [], {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            response = await make_request(i)
+            elapsed = time.perf_counter() - start
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code < 300:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+class Bench:
+    def __init__(self, main, data, args):
+        import httpx
+
+        self.main = main
+        self.data = data
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+        self.user_subjects = {}
+        for user_id, code, _, _ in data.subjects:
+            self.user_subjects.setdefault(user_id, []).append(code)
+        self.tokens = {}
+
+    def headers(self, user_id: int) -> dict:
+        token = self.tokens.get(user_id)
+        if token is None:
+            token = self.tokens[user_id] = self.main.create_access_token(
+                data={"user_id": user_id, "email": f"user{user_id}@bench.local"})
+        return {"Authorization": f"Bearer {token}"}
+
+    def pick_user(self) -> int:
+        return self.rng.choice(list(self.user_subjects))
+
+    # --- Scenarios ---
+
+    def train(self) -> dict:
+        result = {}
+        for label in ('cold', 'warm'):
+            start = time.perf_counter()
+            ok = self.main.train_models()
+            wall = time.perf_counter() - start
+            run = self.main.training_ledger.recent(1, scope='global')
+            phases = {p['name']: p['wall_s'] for p in run[0]['phases']} if run else {}
+            result[label] = {'ok': ok, 'wall_s': round(wall, 3), 'phases': phases}
+        return result
+
+    async def predict(self) -> dict:
+        if 'duration_model' not in self.main.ml_models:
+            self.main.train_models()
+        # Requests are drawn up front so every run sends the same sequence
+        requests = []
+        for _ in range(self.args.requests):
+            user_id = self.pick_user()
+            requests.append((self.headers(user_id), {
+                'subject': self.rng.choice(self.user_subjects[user_id]),
+                'category': self.rng.choice(['Technical', 'Theory', 'Project']),
+                'difficulty': self.rng.randint(1, 5),
+                'days_to_deadline': self.rng.randint(1, 14),
+                'days_started_before': self.rng.randint(0, 3),
+            }))
+
+        async def send(i):
+            headers, body = requests[i]
+            return await self.client.post('/predict', json=body, headers=headers)
+
+        result = {}
+        for label, concurrency in (('sequential', 1), ('concurrent', self.args.concurrency)):
+            await run_load(send, min(50, len(requests)), concurrency)  # warm up feature store and pools
+            latencies, statuses, wall = await run_load(send, len(requests), concurrency)
+            result[label] = {**latency_summary(latencies, wall), 'concurrency': concurrency, 'statuses': statuses}
+        return result
+
+    async def tasks(self) -> dict:
+        users = [self.pick_user() for _ in range(self.args.requests)]
+
+        async def first_page(i):
+            return await self.client.get('/tasks', params={'limit': 50}, headers=self.headers(users[i]))
+
+        latencies, statuses, wall = await run_load(first_page, len(users), 1)
+        result = {'first_page': {**latency_summary(latencies, wall), 'statuses': statuses}}
+
+        # Full cursor walk for the user with the most tasks
+        counts = np.bincount(self.data.tasks['user_id'])
+        user_id = int(counts.argmax())
+        page_latencies, cursor, rows = [], None, 0
+        walk_start = time.perf_counter()
+        while True:
+            params = {'limit': 50, **({'before_id': cursor} if cursor else {})}
+            start = time.perf_counter()
+            response = await self.client.get('/tasks', params=params, headers=self.headers(user_id))
+            page_latencies.append(time.perf_counter() - start)
+            rows += len(response.json())
+            cursor = response.headers.get('x-next-cursor')
+            if not cursor:
+                break
+        result['cursor_walk'] = {**latency_summary(page_latencies, time.perf_counter() - walk_start),
+                                 'rows': rows, 'pages': len(page_latencies)}
+        return result
+
+    async def login(self) -> dict:
+        from benchmarks.datagen import BENCH_PASSWORD
+
+        self.main.password_hasher.warm()
+        users = [self.pick_user() for _ in range(self.args.logins)]
+
+        async def send(i):
+            return await self.client.post('/login', data={'username': f"user{users[i]}@bench.local",
+                                                          'password': BENCH_PASSWORD})
+
+        latencies, statuses, wall = await run_load(send, len(users), self.args.login_concurrency)
+        return {**latency_summary(latencies, wall), 'concurrency': self.args.login_concurrency, 'statuses': statuses}
+
+
+def bench_password_hash() -> str:
+    """bcrypt hash of BENCH_PASSWORD at the app's cost factor, computed once."""
+    import bcrypt
+
+    from benchmarks.datagen import BENCH_PASSWORD
+
+    global _password_hash
+    with _hash_lock:
+        if _password_hash is None:
+            _password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return _password_hash
+
+
+def load_database(storage, data):
+    """Migrate a fresh database and bulk load the generated data into it."""
+    from benchmarks.datagen import task_rows
+    from importer import TASK_COLUMNS
+    from migrations import m005_subject_stats, m006_task_weekly_stats, run_migrations
+
+    storage.create_database()
+    conn = storage.connect()
+    try:
+        run_migrations(conn)
+        cursor = conn.cursor()
+        password_hash = bench_password_hash()
+        cursor.executemany("INSERT INTO users (user_id, email, password_hash, name) VALUES (%s, %s, %s, %s)",
+                           [(user_id, email, password_hash, name) for user_id, email, name in data.users])
+        cursor.executemany(
+            "INSERT INTO subjects (user_id, subject_code, subject_name, is_terror_prof) VALUES (%s, %s, %s, %s)",
+            data.subjects)
+        columns = ['user_id'] + TASK_COLUMNS + ['created_at']
+        cursor.executemany(
+            f"INSERT INTO assignment_logs ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            ((*row[:-1], row[-1].strftime('%Y-%m-%d %H:%M:%S')) for row in task_rows(data, columns)))
+        # The app maintains these on insert; rebuild them in one pass with the migrations' backfills
+        m005_subject_stats(cursor)
+        m006_task_weekly_stats(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def prepare(main, rows: int, args, workdir: str):
+    """Generate and load a dataset, and point the app at it with empty caches."""
+    from benchmarks.datagen import generate
+    from db import AsyncConnectionPool, ConnectionPool
+    from feature_store import FeatureStore
+    from storage import SQLiteStorage
+
+    start = time.perf_counter()
+    data = generate(rows, args.seed)
+    storage = SQLiteStorage(os.path.join(workdir, f"bench-{rows}.sqlite3"))
+    load_database(storage, data)
+    setup_s = time.perf_counter() - start
+
+    main.storage = storage
+    main.db_pool.dispose()
+    main.db_pool = ConnectionPool(storage.connect, size=main.DB_POOL_SIZE,
+                                  max_overflow=main.DB_POOL_MAX_OVERFLOW, timeout=main.DB_POOL_TIMEOUT,
+                                  recycle=main.DB_POOL_RECYCLE, pre_ping=main.DB_POOL_PRE_PING)
+    # Connections of the async pool belong to the event loop that opened them; start empty
+    main.async_db_pool = AsyncConnectionPool(storage.connect_async, size=main.ASYNC_DB_POOL_SIZE,
+                                             max_overflow=main.ASYNC_DB_POOL_MAX_OVERFLOW,
+                                             timeout=main.DB_POOL_TIMEOUT, recycle=main.DB_POOL_RECYCLE,
+                                             pre_ping=main.DB_POOL_PRE_PING)
+    main.feature_store = FeatureStore(main.get_db_connection, max_users=main.FEATURE_STORE_MAX_USERS,
+                                      connect_async=main.get_async_db_connection)
+    main.ml_models = {}
+    return data, setup_s
+
+
+def git_commit() -> dict:
+    def git(*cmd):
+        return subprocess.run(['git', *cmd], capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def flatten(results: list) -> dict:
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, inner in value.items():
+                walk(f"{prefix}.{key}", inner)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix] = value
+
+    for entry in results:
+        walk(f"{entry['rows']}.{entry['scenario']}", entry['metrics'])
+    return flat
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    print(f"\nCompared with {baseline_path} ({(baseline['meta'].get('commit') or 'unknown')[:10]})")
+    print(f"{'metric':<60} {'before':>12} {'after':>12} {'ratio':>7}")
+    for key in sorted(set(old) & set(new)):
+        if key.endswith(('.requests', '.concurrency', '.rows', '.pages')) or '.statuses.' in key:
+            continue
+        ratio = new[key] / old[key] if old[key] else float('nan')
+        print(f"{key:<60} {old[key]:>12.3f} {new[key]:>12.3f} {ratio:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per predict/tasks measurement')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--login-concurrency', type=int, default=32)
+    parser.add_argument('--out', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    # Keep artifacts, locks and the ledger out of the real artifact directory
+    os.environ['ARTIFACT_DIR'] = os.path.join(workdir, 'artifacts')
+    import main as app_main
+
+    output = {
+        'meta': {
+            **git_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'args': vars(args),
+            'settings': {name: os.getenv(name) for name in RECORDED_SETTINGS},
+            'setup_s': {},
+        },
+        'results': [],
+    }
+
+    loop = asyncio.new_event_loop()
+    try:
+        for rows in args.rows:
+            data, setup_s = prepare(app_main, rows, args, workdir)
+            output['meta']['setup_s'][str(rows)] = round(setup_s, 2)
+            print(f"\n== {rows} rows, {len(data.users)} users (generated and loaded in {setup_s:.1f}s)")
+            bench = Bench(app_main, data, args)
+            for scenario in args.scenarios:
+                outcome = getattr(bench, scenario)()
+                metrics = loop.run_until_complete(outcome) if asyncio.iscoroutine(outcome) else outcome
+                output['results'].append({'rows': rows, 'scenario': scenario, 'metrics': metrics})
+                print(f"{scenario}: {json.dumps(metrics)}")
+            loop.run_until_complete(bench.client.aclose())
+    finally:
+        loop.close()
+        app_main.password_hasher.shutdown()
+        app_main.training_worker.shutdown()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark the vectorized feature engine against the original per-row loop.
+
+Usage (from backend/):
+    python -m benchmarks.bench_features
+    python -m benchmarks.bench_features --sizes 10000 100000 1000000 --legacy-max 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import add_engineered_features
+
+SUBJECTS = ['CCINFOM', 'CSSWENG', 'CSARCH2', 'STADVDB', 'GEETHIC', 'LCFILIB', 'MTH101A', 'CSALGCM']
+
+
+def make_frame(n_rows: int, seed: int = 42, n_users: int = 50) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'task_id': np.arange(1, n_rows + 1),
+        'user_id': rng.integers(1, n_users + 1, n_rows),
+        'subject_code': rng.choice(SUBJECTS, n_rows),
+        'actual_hours_spent': rng.gamma(2.0, 3.0, n_rows).round(1),
+        'final_grade_received': rng.choice([2.0, 2.5, 3.0, 3.5, 4.0], n_rows),
+    })
+
+
+def legacy_features(df: pd.DataFrame) -> pd.DataFrame:
+    """The original train_models() loop, updated to the per-user definitions, kept for comparison."""
+    df = df.sort_values('task_id').reset_index(drop=True)
+    by_subject = df.groupby(['user_id', 'subject_code'])['final_grade_received']
+    df['subject_cumulative_gpa'] = by_subject.transform(lambda g: g.expanding().mean().shift(1)).fillna(3.0)
+    df['workload_last_7_days'] = 0.0
+    for idx in range(len(df)):
+        earlier = df.loc[:idx-1]
+        recent_hours = earlier.loc[earlier['user_id'] == df.at[idx, 'user_id'], 'actual_hours_spent'].tail(7).sum()
+        df.at[idx, 'workload_last_7_days'] = recent_hours
+    df['assignment_sequence'] = df.groupby(['user_id', 'subject_code']).cumcount() + 1
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    out = fn(df.copy())
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max', type=int, default=10_000,
+                        help='Largest size to also run through the O(n^2) legacy loop')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'vectorized (s)':>15} {'legacy (s)':>12} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_frame(n)
+        fast, fast_s = timed(add_engineered_features, df)
+        if n <= args.legacy_max:
+            slow, slow_s = timed(legacy_features, df)
+            for col in ('subject_cumulative_gpa', 'workload_last_7_days', 'assignment_sequence'):
+                np.testing.assert_allclose(fast[col].to_numpy(), slow[col].to_numpy(), rtol=1e-9)
+            print(f"{n:>10} {fast_s:>15.4f} {slow_s:>12.4f} {slow_s / fast_s:>8.0f}x")
+        else:
+            print(f"{n:>10} {fast_s:>15.4f} {'-':>12} {'-':>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Latency of the compiled forest evaluator against the stock sklearn predict.
+
+Usage (from backend/):
+    python -m benchmarks.bench_inference
+    python -m benchmarks.bench_inference --trees 100 --max-depth 20 --batches 1 10 50 200
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from inference import CompiledForest
+
+
+def percentile_us(samples, q):
+    return float(np.percentile(samples, q)) * 1e6
+
+
+def measure(fn, X, repeats):
+    fn(X)  # warm up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help='Training rows')
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 10, 50, 200])
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.random((args.rows, 7)) * 10
+    y = X[:, 0] * 2 + rng.normal(0, 1, args.rows)
+    # Same construction as training (n_jobs=-1), which is what serving used to pay for
+    forest = RandomForestRegressor(n_estimators=args.trees, max_depth=args.max_depth,
+                                   random_state=42, n_jobs=-1).fit(X, y)
+    start = time.perf_counter()
+    compiled = CompiledForest(forest)
+    print(f"Compiled {args.trees} trees in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({compiled.nbytes / 1e6:.1f} MB, depth {compiled.max_depth})")
+
+    # Exactness against sequential sklearn summation
+    forest.set_params(n_jobs=1)
+    check = rng.random((1000, 7)) * 10
+    assert np.array_equal(compiled.predict(check), forest.predict(check)), "compiled output differs from sklearn"
+    forest.set_params(n_jobs=-1)
+
+    print(f"{'batch':>6} {'sklearn p50 (us)':>17} {'p99':>9} {'compiled p50 (us)':>18} {'p99':>9} {'speedup':>8}")
+    for batch in args.batches:
+        Xb = rng.random((batch, 7)) * 10
+        stock = measure(forest.predict, Xb, args.repeats)
+        fast = measure(compiled.predict, Xb, args.repeats)
+        print(f"{batch:>6} {percentile_us(stock, 50):>17.0f} {percentile_us(stock, 99):>9.0f} "
+              f"{percentile_us(fast, 50):>18.0f} {percentile_us(fast, 99):>9.0f} "
+              f"{np.median(stock) / np.median(fast):>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
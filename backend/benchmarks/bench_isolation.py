@@ -0,0 +1,151 @@
+"""
+Request latency while the models retrain.
+
+Loads a generated dataset (see bench_e2e.py), trains once, then keeps a mixed
+stream of POST /predict and GET /tasks requests going through the ASGI app:
+first with no training running, then during a full-search retrain with
+fitting inline on a server thread using every core (the old behaviour), then
+during the same retrain in the training worker process (TRAINING_CPUS,
+TRAINING_NICE, thread limits; see training_worker.py). Each phase reports
+p50/p99 per route and how long the retrain took.
+
+The load is closed-loop and keeps every serving thread busy, so on a machine
+with few cores the niced worker gets little CPU and its retrain takes much
+longer than the inline one. That is the trade the isolation makes; size
+TRAINING_CPUS so the worker has cores of its own.
+
+Inline runs first: the process mode caps this process's BLAS/OpenMP pools
+at one thread, as the server does at startup, and that can't be undone.
+
+Usage (from backend/):
+    python -m benchmarks.bench_isolation
+    python -m benchmarks.bench_isolation --rows 50000 --concurrency 16 --out isolation.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+MODES = ['inline', 'process']
+
+
+async def load_until(send, done: threading.Event, concurrency: int) -> dict:
+    """Keep `concurrency` requests in flight until `done` is set. Returns route -> latencies."""
+    latencies = {}
+    counter = itertools.count()
+
+    async def worker():
+        while not done.is_set():
+            route, request = send(next(counter))
+            start = time.perf_counter()
+            response = await request
+            if response.status_code < 300:
+                latencies.setdefault(route, []).append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def measure(loop, bench, send, args, retrain=None) -> dict:
+    """Latency under load, either for a fixed idle period or for as long as `retrain` runs."""
+    from benchmarks.bench_e2e import latency_summary
+
+    done = threading.Event()
+    result = {}
+    if retrain is None:
+        timer = threading.Timer(args.idle_seconds, done.set)
+        timer.start()
+    else:
+        # Cached params would turn the retrain into a single fit; force the full search
+        bench.main.ml_models.pop('tuning', None)
+
+        def train():
+            start = time.perf_counter()
+            try:
+                result['retrain_ok'] = retrain()
+            finally:
+                result['retrain_s'] = round(time.perf_counter() - start, 3)
+                done.set()
+        threading.Thread(target=train, daemon=True).start()
+
+    start = time.perf_counter()
+    latencies = loop.run_until_complete(load_until(send, done, args.concurrency))
+    wall = time.perf_counter() - start
+    for route, samples in sorted(latencies.items()):
+        result[route] = latency_summary(samples, wall)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--idle-seconds', type=float, default=5.0)
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument('--out', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-isolation-")
+    os.environ['ARTIFACT_DIR'] = os.path.join(workdir, 'artifacts')
+    import main as app_main
+    from benchmarks.bench_e2e import Bench, prepare
+    from training_worker import TrainingWorker, limit_serving_threads
+
+    data, setup_s = prepare(app_main, args.rows, argparse.Namespace(seed=args.seed), workdir)
+    print(f"{args.rows} rows, {len(data.users)} users (generated and loaded in {setup_s:.1f}s), "
+          f"{os.cpu_count()} CPUs")
+    bench = Bench(app_main, data, argparse.Namespace(seed=args.seed))
+    app_main.train_models()
+
+    # Requests are drawn up front so every phase sends the same sequence
+    requests = []
+    for _ in range(2000):
+        user_id = bench.pick_user()
+        requests.append((bench.headers(user_id), {
+            'subject': bench.rng.choice(bench.user_subjects[user_id]),
+            'category': bench.rng.choice(['Technical', 'Theory', 'Project']),
+            'difficulty': bench.rng.randint(1, 5),
+            'days_to_deadline': bench.rng.randint(1, 14),
+            'days_started_before': bench.rng.randint(0, 3),
+        }))
+
+    def send(i):
+        headers, body = requests[i % len(requests)]
+        if i % 2:
+            return 'tasks', bench.client.get('/tasks', params={'limit': 50}, headers=headers)
+        return 'predict', bench.client.post('/predict', json=body, headers=headers)
+
+    loop = asyncio.new_event_loop()
+    results = {'rows': args.rows, 'cpu_count': os.cpu_count(), 'concurrency': args.concurrency}
+    try:
+        results['idle'] = measure(loop, bench, send, args)
+        print(f"idle: {json.dumps(results['idle'])}")
+        for mode in [m for m in MODES if m in args.modes]:
+            app_main.training_worker.shutdown()
+            if mode == 'inline':
+                app_main.training_worker = TrainingWorker(mode="thread", cpus=os.cpu_count() or 1)
+            else:
+                app_main.training_worker = TrainingWorker(mode="process")
+                limit_serving_threads()
+            results[mode] = {**measure(loop, bench, send, args, retrain=app_main.train_models),
+                             'worker': app_main.training_worker.stats()}
+            print(f"{mode}: {json.dumps(results[mode])}")
+        loop.run_until_complete(bench.client.aclose())
+    finally:
+        loop.close()
+        app_main.password_hasher.shutdown()
+        app_main.training_worker.shutdown()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
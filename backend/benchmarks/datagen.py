@@ -0,0 +1,140 @@
+"""
+Seeded synthetic semester data: users, their subjects and assignment_logs rows.
+
+Distributions follow the shape of the sample history in populate_data.py:
+mostly Technical work, fewer long Projects, grades on the 0.0-4.0 scale
+skewed high, lower under terror profs and for tasks started late. The same
+seed always produces the same rows, so runs on different commits see
+identical data.
+
+    from benchmarks.datagen import generate
+    data = generate(100_000, seed=42)   # data.users, data.subjects, data.tasks
+
+CLI usage (from backend/), writes one user's history as NDJSON for
+POST /tasks/import or importer.py:
+    python -m benchmarks.datagen --rows 10000 > history.ndjson
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import List, NamedTuple
+
+import numpy as np
+
+COURSES = ['CCINFOM', 'CSSWENG', 'CSALGCM', 'CSINTSY', 'CSARCH2', 'STADVDB', 'CSOPESY', 'CSNETWK',
+           'GEETHIC', 'LCFILIB', 'MTH101A', 'GEMATMW', 'CCPROG3', 'CCDSTRU', 'STSWENG', 'CSMODEL']
+CATEGORIES = ['Technical', 'Theory', 'Project']
+CATEGORY_WEIGHTS = [0.55, 0.3, 0.15]
+# Per category: (difficulty low, high), (days to deadline low, high), base hours
+CATEGORY_SHAPE = {
+    'Technical': ((2, 5), (3, 7), 2.5),
+    'Theory': ((3, 5), (5, 10), 8.0),
+    'Project': ((4, 5), (10, 20), 16.0),
+}
+GRADE_STEPS = np.array([0.0, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0])
+TERROR_RATE = 0.2
+TASKS_PER_USER = 250
+SUBJECTS_PER_USER = (5, 8)
+SEMESTER_WEEKS = 14
+SEMESTER_START = datetime(2025, 8, 25)
+
+# Every generated user logs in with this password
+BENCH_PASSWORD = "benchmark-password"
+
+
+class SemesterData(NamedTuple):
+    # (user_id, email, name)
+    users: List[tuple]
+    # (user_id, subject_code, subject_name, is_terror_prof)
+    subjects: List[tuple]
+    # Column name -> array, one entry per task, in task_id order
+    tasks: dict
+
+
+def generate(n_rows: int, seed: int = 42, tasks_per_user: int = TASKS_PER_USER) -> SemesterData:
+    rng = np.random.default_rng(seed)
+    n_users = max(1, n_rows // tasks_per_user)
+
+    users = [(u, f"user{u}@bench.local", f"Bench User {u}") for u in range(1, n_users + 1)]
+    subject_counts = rng.integers(SUBJECTS_PER_USER[0], SUBJECTS_PER_USER[1] + 1, n_users)
+    user_subjects = np.empty((n_users, SUBJECTS_PER_USER[1]), dtype=object)
+    user_terror = np.zeros((n_users, SUBJECTS_PER_USER[1]), dtype=np.int8)
+    subjects = []
+    for u in range(n_users):
+        codes = rng.choice(COURSES, subject_counts[u], replace=False)
+        terror = (rng.random(subject_counts[u]) < TERROR_RATE).astype(np.int8)
+        user_subjects[u, :len(codes)] = codes
+        user_terror[u, :len(codes)] = terror
+        subjects.extend((u + 1, code, code, int(t)) for code, t in zip(codes, terror))
+
+    # Users log work throughout the semester, interleaved in task_id order
+    owner = rng.integers(0, n_users, n_rows)
+    slot = (rng.random(n_rows) * subject_counts[owner]).astype(np.int64)
+    subject_code = user_subjects[owner, slot]
+    is_terror = user_terror[owner, slot]
+
+    category_idx = rng.choice(len(CATEGORIES), n_rows, p=CATEGORY_WEIGHTS)
+    category = np.array(CATEGORIES, dtype=object)[category_idx]
+    difficulty = np.empty(n_rows, dtype=np.int64)
+    days_to_deadline = np.empty(n_rows, dtype=np.int64)
+    base_hours = np.empty(n_rows)
+    for i, name in enumerate(CATEGORIES):
+        mask = category_idx == i
+        (d_lo, d_hi), (t_lo, t_hi), hours = CATEGORY_SHAPE[name]
+        difficulty[mask] = rng.integers(d_lo, d_hi + 1, mask.sum())
+        days_to_deadline[mask] = rng.integers(t_lo, t_hi + 1, mask.sum())
+        base_hours[mask] = hours
+
+    # Most work starts close to the deadline
+    days_started = np.minimum(rng.geometric(0.45, n_rows) - 1, days_to_deadline)
+    predicted = np.round(base_hours * difficulty / 3 * rng.lognormal(0, 0.3, n_rows) * 2) / 2
+    actual = np.round(predicted * rng.lognormal(0.05 + 0.15 * is_terror, 0.25) * 2) / 2
+    predicted = np.maximum(predicted, 0.5)
+    actual = np.maximum(actual, 0.5)
+
+    score = (3.55 - 0.45 * is_terror + 0.08 * days_started - 0.12 * (difficulty - 3)
+             + rng.normal(0, 0.45, n_rows))
+    grade = GRADE_STEPS[np.abs(score[:, None] - GRADE_STEPS[None, :]).argmin(axis=1)]
+
+    seconds = np.sort(rng.random(n_rows)) * SEMESTER_WEEKS * 7 * 86400
+    created_at = [SEMESTER_START + timedelta(seconds=float(s)) for s in seconds]
+
+    tasks = {
+        'user_id': owner + 1,
+        'subject_code': subject_code,
+        'assignment_name': np.char.add(category.astype(str), np.char.add(' ', (np.arange(n_rows) + 1).astype(str))),
+        'task_category': category,
+        'difficulty_rating': difficulty,
+        'days_to_deadline': days_to_deadline,
+        'predicted_hours': predicted,
+        'actual_hours_spent': actual,
+        'days_started_before_deadline': days_started,
+        'final_grade_received': grade,
+        'created_at': created_at,
+    }
+    return SemesterData(users, subjects, tasks)
+
+
+def task_rows(data: SemesterData, columns: List[str]):
+    """Plain Python tuples of the given task columns, for executemany()."""
+    arrays = [data.tasks[c].tolist() if isinstance(data.tasks[c], np.ndarray) else data.tasks[c] for c in columns]
+    return zip(*arrays)
+
+
+def main():
+    from importer import TASK_COLUMNS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    data = generate(args.rows, args.seed, tasks_per_user=args.rows)
+    for *values, created_at in task_rows(data, TASK_COLUMNS + ['created_at']):
+        record = dict(zip(TASK_COLUMNS, values), completed_at=created_at.isoformat(timespec='seconds'))
+        sys.stdout.write(json.dumps(record) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Coordination between uvicorn workers sharing one artifact directory.
+
+Exactly one process trains: whichever holds the trainer lock (an flock on
+`<root>/trainer.lock`, released by the OS if that process dies). Other
+workers forward retrain requests as marker files under `<root>/requests/`
+and hot-reload models when the trainer publishes a new version, noticed by
+stat-ing the artifact stores' LATEST pointers.
+"""
+import fcntl
+import os
+import threading
+from typing import Callable, List, Optional
+
+
+class TrainerLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self, blocking: bool = False) -> bool:
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class RetrainRequests:
+    """Marker files asking the trainer for a retrain: `global` or `user-<id>`."""
+
+    GLOBAL = "global"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def submit(self, user_id: Optional[int] = None):
+        os.makedirs(self.root, exist_ok=True)
+        name = self.GLOBAL if user_id is None else f"user-{user_id}"
+        with open(os.path.join(self.root, name), "a"):
+            pass
+
+    def drain(self) -> List[Optional[int]]:
+        """Pending requests (None for global), removing their markers."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        requests = []
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue  # Another drainer got it
+            if name == self.GLOBAL:
+                requests.append(None)
+            elif name.startswith("user-") and name[5:].isdigit():
+                requests.append(int(name[5:]))
+        return requests
+
+
+class ModelWatcher:
+    """
+    Calls `tick` every `interval` seconds on a daemon thread. The app's tick
+    drains forwarded requests when it is the trainer, and otherwise reloads
+    newly published models (and retries the election if the trainer exited).
+    """
+
+    def __init__(self, interval: float, tick: Callable[[], None]):
+        self.interval = interval
+        self.tick = tick
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Model watcher error: {e}")
@@ -0,0 +1,237 @@
+"""
+Dashboard analytics from the `task_weekly_stats` summary table.
+
+One row per (user, week, subject, category) holds running counts and sums,
+updated with the same cursor as the task insert (like subject_stats), so the
+summary is built from a handful of aggregate rows instead of GROUP BY scans
+over assignment_logs. Weeks start on Monday. A task created through the API
+counts in the week it was logged (the database clock at insert time).
+Imported rows count in the week of their completed_at column (see
+importer.py), or in the import week when the column is absent. Tasks that
+predate migration 6 had no timestamp, so the migration stamped them with its
+own time and they all sit in that week.
+
+Built summaries are cached per user and dropped on that user's next write in
+this process; DASHBOARD_CACHE_SECONDS bounds how stale a summary can get when
+the write went through another worker.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "60"))
+DASHBOARD_CACHE_USERS = int(os.getenv("DASHBOARD_CACHE_USERS", "10000"))
+# Weeks of workload (empty ones included) and GPA trend returned, newest last
+DASHBOARD_WEEKS = 26
+# Grades at or above this count as "great" on the dashboard
+GREAT_GRADE = 3.5
+
+# Monday of the week of a date parameter (given twice), or of today when it is NULL
+WEEK_OF = "DATE_SUB(DATE(COALESCE(%s, CURDATE())), INTERVAL WEEKDAY(COALESCE(%s, CURDATE())) DAY)"
+
+UPSERT_WEEKLY_STATS = f"""
+    INSERT INTO task_weekly_stats
+        (user_id, week_start, subject_code, task_category, task_count, hours_sum, grade_sum, grade_count, great_count)
+    VALUES (%s, {WEEK_OF}, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        task_count = task_count + VALUES(task_count),
+        hours_sum = hours_sum + VALUES(hours_sum),
+        grade_sum = grade_sum + VALUES(grade_sum),
+        grade_count = grade_count + VALUES(grade_count),
+        great_count = great_count + VALUES(great_count)
+"""
+
+# Served by the primary key (user_id, week_start, ...)
+SELECT_WEEKLY_STATS = """
+    SELECT week_start, subject_code, task_category, task_count, hours_sum, grade_sum, grade_count, great_count
+    FROM task_weekly_stats
+    WHERE user_id = %s
+    ORDER BY week_start
+"""
+
+
+def _totals(hours: Optional[float], grade: Optional[float]) -> list:
+    return [1, hours or 0.0, grade or 0.0, 1 if grade is not None else 0,
+            1 if grade is not None and grade >= GREAT_GRADE else 0]
+
+
+def week_start(completed_at: Optional[str]) -> Optional[str]:
+    """Monday of a 'YYYY-MM-DD[ HH:MM:SS]' timestamp, or None (this week, by the database clock)."""
+    if completed_at is None:
+        return None
+    day = date.fromisoformat(completed_at[:10])
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def record_task(cursor, user_id: int, subject_code: str, task_category: Optional[str],
+                hours: Optional[float], grade: Optional[float], completed_at: Optional[str] = None):
+    """Add one freshly inserted task to its week's aggregates (this week unless completed_at is given)."""
+    week = week_start(completed_at)
+    cursor.execute(UPSERT_WEEKLY_STATS, (user_id, week, week, subject_code, task_category or '',
+                                         *_totals(hours, grade)))
+
+
+async def record_task_async(cursor, user_id: int, subject_code: str, task_category: Optional[str],
+                            hours: Optional[float], grade: Optional[float]):
+    await cursor.execute(UPSERT_WEEKLY_STATS, (user_id, None, None, subject_code, task_category or '',
+                                               *_totals(hours, grade)))
+
+
+def record_batch(cursor, user_id: int,
+                 tasks: Iterable[Tuple[str, Optional[str], Optional[float], Optional[float], Optional[str]]]):
+    """Add a batch of inserted (subject_code, task_category, hours, grade, completed_at) rows, one upsert per group."""
+    groups: "OrderedDict[Tuple[Optional[str], str, str], list]" = OrderedDict()
+    for subject_code, task_category, hours, grade, completed_at in tasks:
+        key = (week_start(completed_at), subject_code, task_category or '')
+        total = groups.get(key)
+        if total is None:
+            groups[key] = _totals(hours, grade)
+        else:
+            for i, value in enumerate(_totals(hours, grade)):
+                total[i] += value
+    rows = [(user_id, week, week, subject_code, task_category, *total)
+            for (week, subject_code, task_category), total in groups.items()]
+    if rows:
+        cursor.executemany(UPSERT_WEEKLY_STATS, rows)
+
+
+def _average(grade_sum: float, grade_count: int) -> Optional[float]:
+    return round(grade_sum / grade_count, 3) if grade_count else None
+
+
+class _Bucket:
+    __slots__ = ('tasks', 'hours', 'grade_sum', 'grade_count', 'great')
+
+    def __init__(self):
+        self.tasks = 0
+        self.hours = 0.0
+        self.grade_sum = 0.0
+        self.grade_count = 0
+        self.great = 0
+
+    def add(self, row: dict):
+        self.tasks += int(row['task_count'])
+        self.hours += float(row['hours_sum'])
+        self.grade_sum += float(row['grade_sum'])
+        self.grade_count += int(row['grade_count'])
+        self.great += int(row['great_count'])
+
+    def to_dict(self) -> dict:
+        return {
+            'tasks': self.tasks,
+            'hours': round(self.hours, 2),
+            'average_grade': _average(self.grade_sum, self.grade_count),
+        }
+
+
+def _week_range(first: str, last: str, limit: int) -> List[str]:
+    """Every Monday from `first` to `last`, keeping the newest `limit`."""
+    end = date.fromisoformat(last)
+    start = max(date.fromisoformat(first), end - timedelta(weeks=limit - 1))
+    return [(start + timedelta(weeks=i)).isoformat() for i in range((end - start).days // 7 + 1)]
+
+
+def build_summary(rows: Iterable[dict], weeks: int = DASHBOARD_WEEKS) -> dict:
+    """Fold weekly aggregate rows (ordered by week) into the dashboard summary."""
+    total = _Bucket()
+    by_subject: Dict[str, _Bucket] = {}
+    by_category: Dict[str, _Bucket] = {}
+    by_week: "OrderedDict[str, _Bucket]" = OrderedDict()
+    by_subject_week: Dict[str, "OrderedDict[str, _Bucket]"] = {}
+
+    for row in rows:
+        week = str(row['week_start'])
+        subject = row['subject_code']
+        total.add(row)
+        by_subject.setdefault(subject, _Bucket()).add(row)
+        by_category.setdefault(row['task_category'], _Bucket()).add(row)
+        by_week.setdefault(week, _Bucket()).add(row)
+        by_subject_week.setdefault(subject, OrderedDict()).setdefault(week, _Bucket()).add(row)
+
+    gpa_trend = {}
+    for subject, subject_weeks in by_subject_week.items():
+        points = []
+        grade_sum, grade_count = 0.0, 0
+        for week, bucket in subject_weeks.items():
+            if not bucket.grade_count:
+                continue
+            grade_sum += bucket.grade_sum
+            grade_count += bucket.grade_count
+            points.append({
+                'week_start': week,
+                'average_grade': _average(bucket.grade_sum, bucket.grade_count),
+                'cumulative_gpa': _average(grade_sum, grade_count),
+            })
+        gpa_trend[subject] = points[-weeks:]
+
+    return {
+        'totals': {
+            **total.to_dict(),
+            'graded_tasks': total.grade_count,
+            'great_grades': total.great,
+            'subjects': len(by_subject),
+        },
+        'hours_by_subject': [{'subject_code': subject, **bucket.to_dict()}
+                             for subject, bucket in sorted(by_subject.items(), key=lambda s: -s[1].hours)],
+        'hours_by_category': [{'task_category': category or None, **bucket.to_dict()}
+                              for category, bucket in sorted(by_category.items(), key=lambda c: -c[1].hours)],
+        'gpa_trend': gpa_trend,
+        'weekly_workload': _weekly_workload(by_week, weeks),
+    }
+
+
+def _weekly_workload(by_week: Dict[str, _Bucket], weeks: int) -> List[dict]:
+    # Weeks with no tasks in between show up as zeros, so the chart's x axis is evenly spaced
+    if not by_week:
+        return []
+    empty = _Bucket()
+    workload = []
+    for week in _week_range(min(by_week), max(by_week), weeks):
+        bucket = by_week.get(week, empty)
+        workload.append({'week_start': week, 'tasks': bucket.tasks, 'hours': round(bucket.hours, 2)})
+    return workload
+
+
+class SummaryCache:
+    """Per-user summaries, least recently used evicted past `max_users`."""
+
+    def __init__(self, load: Callable[[int], dict], max_age: float = DASHBOARD_CACHE_SECONDS,
+                 max_users: int = DASHBOARD_CACHE_USERS):
+        self.load = load
+        self.max_age = max_age
+        self.max_users = max_users
+        self._entries: "OrderedDict[int, Tuple[float, dict]]" = OrderedDict()
+        # Bumped on every write so a load that raced a write isn't cached
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] < self.max_age:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            generation = self._generations.get(user_id, 0)
+
+        summary = self.load(user_id)
+
+        with self._lock:
+            if self._generations.get(user_id, 0) == generation:
+                self._entries[user_id] = (now, summary)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._generations.pop(evicted, None)
+        return summary
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
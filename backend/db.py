@@ -0,0 +1,374 @@
+"""
+Database connection pool.
+
+Connections are checked out with `acquire()` and handed back when the caller
+calls `close()` on them, so route code written against plain connections
+works unchanged. The pool holds up to `size` idle connections, opens up to
+`max_overflow` extra ones under load, and makes callers wait at most
+`timeout` seconds for a free slot.
+
+`AsyncConnectionPool` is the same pool for the async routes: connections
+come from an awaitable connect function (see storage.connect_async), and
+waiting for a slot suspends the request instead of blocking a thread. It has
+its own connections and limits, separate from the sync pool.
+"""
+import asyncio
+import sys
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Proxy for a pooled connection; close() returns it to the pool."""
+
+    def __init__(self, pool: "ConnectionPool", conn, created_at: float):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._conn, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Safety net for code paths that forget to close
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, connect: Callable, size: int = 5, max_overflow: int = 10,
+                 timeout: float = 10.0, recycle: float = 1800.0, pre_ping: bool = True):
+        self.connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = deque()  # (conn, created_at), most recently returned last
+        self._open = 0
+        self._cond = threading.Condition()
+        # Metrics
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+
+    def acquire(self) -> PooledConnection:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    # Reserve a slot; the connection is opened outside the lock
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No connection available after {self.timeout}s")
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+        if conn is not None and not self._usable(conn, created_at):
+            self._close_quietly(conn)
+            conn = None
+            with self._cond:
+                self.discarded += 1
+
+        if conn is None:
+            try:
+                conn = self.connect()
+                created_at = time.monotonic()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self.in_use += 1
+            self.checkouts += 1
+            self.checkout_seconds_total += elapsed
+            self.checkout_seconds_max = max(self.checkout_seconds_max, elapsed)
+        return PooledConnection(self, conn, created_at)
+
+    def _usable(self, conn, created_at: float) -> bool:
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                return conn.is_connected()
+            except Exception:
+                return False
+        return True
+
+    def _release(self, conn, created_at: float):
+        # End any open transaction so the next borrower gets a fresh snapshot
+        try:
+            conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self.in_use -= 1
+            if healthy and len(self._idle) < self.size:
+                self._idle.append((conn, created_at))
+                conn = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        """Close all idle connections (checked-out ones close on release)."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+                "checkout_ms_avg": (self.checkout_seconds_total / self.checkouts * 1000) if self.checkouts else None,
+                "checkout_ms_max": self.checkout_seconds_max * 1000,
+            }
+
+
+class AsyncPooledConnection:
+    """Proxy for a connection from an AsyncConnectionPool; `await close()` returns it."""
+
+    def __init__(self, pool: "AsyncConnectionPool", conn, created_at: float):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def close(self):
+        if not self._released:
+            self._released = True
+            await self._pool._release(self._conn, self._created_at)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncConnectionPool:
+    """
+    Same limits and metrics as ConnectionPool. All bookkeeping happens on the
+    event loop thread, so it needs no lock; waiters are served first come,
+    first served, with a returned connection handed straight to the oldest.
+    """
+
+    def __init__(self, connect: Callable[[], Awaitable], size: int = 10, max_overflow: int = 20,
+                 timeout: float = 10.0, recycle: float = 1800.0, pre_ping: bool = True):
+        self.connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = deque()  # (conn, created_at), most recently returned last
+        # Futures of waiting acquirers, oldest first; resolved with (conn, created_at), or None for an open slot
+        self._waiters = deque()
+        self._open = 0
+        # Closes started by cancelled acquires, referenced until they finish
+        self._closing = set()
+        # Metrics
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> AsyncPooledConnection:
+        start = time.monotonic()
+        if self._idle and not self._waiters:
+            entry = self._idle.pop()
+        elif self._open < self.size + self.max_overflow:
+            # Reserve a slot; the connection is opened below
+            self._open += 1
+            entry = None
+        else:
+            entry = await self._wait()
+
+        try:
+            if entry is not None and not await self._usable(*entry):
+                await self._close_quietly(entry[0])
+                entry = None
+                self.discarded += 1
+            if entry is None:
+                entry = (await self.connect(), time.monotonic())
+        except BaseException:
+            # Failed or cancelled while checking or opening: the slot is still ours to free
+            self._give_up_slot()
+            if entry is not None:
+                # A ping may have been cut off mid-reply, so don't reuse the connection
+                self._close_in_background(entry[0])
+            raise
+
+        elapsed = time.monotonic() - start
+        self.in_use += 1
+        self.checkouts += 1
+        self.checkout_seconds_total += elapsed
+        self.checkout_seconds_max = max(self.checkout_seconds_max, elapsed)
+        return AsyncPooledConnection(self, *entry)
+
+    async def _wait(self) -> Optional[tuple]:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeout(f"No connection available after {self.timeout}s")
+        finally:
+            if waiter.done() and not waiter.cancelled():
+                # Handed over just as the wait ended; the caller won't use it
+                if sys.exc_info()[0] is not None:
+                    self._hand_back(waiter.result())
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+
+    def _hand_back(self, entry: Optional[tuple]):
+        if entry is None:
+            self._give_up_slot()
+        else:
+            self._put(entry)
+
+    def _put(self, entry: tuple):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(entry)
+                return
+        self._idle.append(entry)
+
+    def _give_up_slot(self):
+        # Let the oldest waiter open a connection in the freed slot
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._open -= 1
+
+    async def _usable(self, conn, created_at: float) -> bool:
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                return await conn.is_connected()
+            except Exception:
+                return False
+        return True
+
+    async def _release(self, conn, created_at: float):
+        # End any open transaction so the next borrower gets a fresh snapshot
+        try:
+            await conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        self.in_use -= 1
+        if healthy and (self._waiters or len(self._idle) < self.size):
+            self._put((conn, created_at))
+        else:
+            self._give_up_slot()
+            await self._close_quietly(conn)
+
+    @staticmethod
+    async def _close_quietly(conn):
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    def _close_in_background(self, conn):
+        task = asyncio.ensure_future(self._close_quietly(conn))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def dispose(self):
+        """Close all idle connections (checked-out ones close on release)."""
+        idle, self._idle = list(self._idle), deque()
+        self._open -= len(idle)
+        for conn, _ in idle:
+            await self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "max_overflow": self.max_overflow,
+            "open": self._open,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "discarded": self.discarded,
+            "checkout_ms_avg": (self.checkout_seconds_total / self.checkouts * 1000) if self.checkouts else None,
+            "checkout_ms_max": self.checkout_seconds_max * 1000,
+        }
@@ -0,0 +1,97 @@
+"""
+Estimator backends for the duration and grade models.
+
+A backend bundles how to construct the regressor, its search grid per model,
+default params for small datasets and whether it can score itself out-of-bag.
+MODEL_BACKEND picks the backend for both models; MODEL_BACKEND_DURATION and
+MODEL_BACKEND_GRADE override it per model.
+
+    random_forest           RandomForestRegressor on label-encoded columns (default)
+    hist_gradient_boosting  HistGradientBoostingRegressor with native categorical
+                            splits on the encoded subject and category columns
+"""
+import os
+from typing import Callable, Dict, List, Optional
+
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "random_forest")
+
+# Encoded columns that hold categories rather than quantities
+CATEGORICAL_COLUMNS = {'subject_code_encoded', 'task_category_encoded'}
+
+
+class Backend:
+    def __init__(self, name: str, make: Callable[..., object], param_grids: Dict[str, dict],
+                 default_params: dict, oob: bool):
+        self.name = name
+        self._make = make
+        self.param_grids = param_grids
+        self.default_params = default_params
+        self.oob = oob
+
+    def make(self, columns: List[str], cardinalities: Optional[Dict[str, int]] = None, **params):
+        """A fresh unfitted estimator for a model trained on `columns`."""
+        return self._make(columns, cardinalities or {}, **params)
+
+
+def _random_forest(columns, cardinalities, oob_score=False, **params):
+    # oob_score gives the refit winner a drift baseline without another fit.
+    # n_jobs=None: fit with the training worker's joblib budget, predict single-threaded
+    return RandomForestRegressor(oob_score=oob_score, random_state=42, n_jobs=None, **params)
+
+
+HGB_MAX_BINS = 255
+
+
+def _hist_gradient_boosting(columns, cardinalities, oob_score=False, **params):
+    # Native categorical splits need codes below max_bins; wider columns stay numeric
+    categorical = [column in CATEGORICAL_COLUMNS and cardinalities.get(column, 0) <= HGB_MAX_BINS
+                   for column in columns]
+    return HistGradientBoostingRegressor(
+        categorical_features=categorical if any(categorical) else None,
+        max_bins=HGB_MAX_BINS, random_state=42, **params)
+
+
+BACKENDS: Dict[str, Backend] = {
+    'random_forest': Backend(
+        'random_forest', _random_forest,
+        param_grids={
+            'duration': {
+                'n_estimators': [50, 100],
+                'max_depth': [10, 20, None],
+                'min_samples_split': [2, 5],
+                'min_samples_leaf': [1, 2]
+            },
+            'grade': {
+                'n_estimators': [50, 100],
+                'max_depth': [5, 10, 15],
+                'min_samples_split': [2, 5],
+                'min_samples_leaf': [1, 2]
+            },
+        },
+        default_params={'n_estimators': 100, 'max_depth': 10},
+        oob=True,
+    ),
+    'hist_gradient_boosting': Backend(
+        'hist_gradient_boosting', _hist_gradient_boosting,
+        param_grids={
+            name: {
+                'learning_rate': [0.05, 0.1],
+                'max_iter': [100, 300],
+                'max_leaf_nodes': [15, 31],
+                'min_samples_leaf': [10, 20],
+            }
+            for name in ('duration', 'grade')
+        },
+        default_params={'max_iter': 100},
+        oob=False,
+    ),
+}
+
+
+def backend_for(model_name: str) -> Backend:
+    name = os.getenv(f"MODEL_BACKEND_{model_name.upper()}", MODEL_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend {name!r} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name]
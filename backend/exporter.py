@@ -0,0 +1,132 @@
+"""
+Task listing helpers: column projection and streaming export.
+
+Exports read from an unbuffered (server-side) cursor with fetchmany, so
+memory use stays constant regardless of history length and the first bytes
+go out as soon as the first chunk is read.
+
+The connection behind an export is held until the client has downloaded the
+whole body, however slowly, so exports don't borrow from the request pool:
+each one opens its own connection, and EXPORT_MAX_CONCURRENT caps how many
+run at once (see export_tasks in main.py).
+"""
+import csv
+import io
+import json
+import os
+import weakref
+import zlib
+from typing import Callable, Iterator, List, Optional
+
+EXPORT_CHUNK_ROWS = 1000
+# Exports streaming at once; further requests get a 503
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "4"))
+
+# Column name -> SQL expression (the cursor always starts from task_id)
+TASK_FIELDS = {
+    'task_id': 'a.task_id',
+    'subject_code': 'a.subject_code',
+    'assignment_name': 'a.assignment_name',
+    'task_category': 'a.task_category',
+    'difficulty_rating': 'a.difficulty_rating',
+    'days_to_deadline': 'a.days_to_deadline',
+    'predicted_hours': 'a.predicted_hours',
+    'actual_hours_spent': 'a.actual_hours_spent',
+    'days_started_before_deadline': 'a.days_started_before_deadline',
+    'final_grade_received': 'a.final_grade_received',
+    'is_terror_prof': 'COALESCE(s.is_terror_prof, 0)',
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a comma-separated projection. None means all columns."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if 'task_id' not in names:
+        names.insert(0, 'task_id')
+    return names
+
+
+def select_list(fields: Optional[List[str]]) -> str:
+    if fields is None:
+        return "a.*, COALESCE(s.is_terror_prof, 0) as is_terror_prof"
+    return ", ".join(f"{TASK_FIELDS[name]} AS {name}" for name in fields)
+
+
+def _encode_chunks(cursor, fmt: str) -> Iterator[bytes]:
+    columns = [col[0] for col in cursor.description]
+    header_written = False
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            break
+        if fmt == 'csv':
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            yield buf.getvalue().encode('utf-8')
+        else:
+            yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows).encode('utf-8')
+    if fmt == 'csv' and not header_written:
+        yield (",".join(columns) + "\r\n").encode('utf-8')
+
+
+def _encode(cursor, fmt: str, gzip: bool) -> Iterator[bytes]:
+    if not gzip:
+        yield from _encode_chunks(cursor, fmt)
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in _encode_chunks(cursor, fmt):
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _release(conn, on_close: Optional[Callable[[], None]]):
+    try:
+        conn.close()
+    finally:
+        if on_close is not None:
+            on_close()
+
+
+class ExportStream:
+    """
+    Encoded chunks from an executed cursor. The connection is closed and
+    `on_close` called exactly once: when the stream ends or fails, or when it
+    is dropped, including before the first chunk (a client that disconnects
+    before the body starts never iterates it).
+    """
+
+    def __init__(self, conn, cursor, fmt: str, gzip: bool = False,
+                 on_close: Optional[Callable[[], None]] = None):
+        self._chunks = _encode(cursor, fmt, gzip)
+        self._release = weakref.finalize(self, _release, conn, on_close)
+
+    def __iter__(self) -> "ExportStream":
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self._chunks.close()
+        self._release()
+
+
+def stream_export(conn, cursor, fmt: str, gzip: bool = False,
+                  on_close: Optional[Callable[[], None]] = None) -> ExportStream:
+    """Yield encoded chunks from an executed cursor, closing the connection when done."""
+    return ExportStream(conn, cursor, fmt, gzip=gzip, on_close=on_close)
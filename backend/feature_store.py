@@ -0,0 +1,293 @@
+"""
+In-process feature store for /predict.
+
+Keeps running grade sums, counts and the terror-prof flag per (user, subject),
+plus a ring buffer of each user's last 7 task hours. Writes update it
+incrementally, so building prediction features needs no SQL once a user is
+loaded. Users are kept in LRU order and the least recently used are evicted
+past `max_users`; an evicted user is reloaded from the DB on next access.
+Async routes read through `get_features_many_async`, which loads a missing
+user over `connect_async` (an awaitable pooled connection) instead.
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+from features import WORKLOAD_WINDOW, DEFAULT_GPA
+from metrics import SQL_QUERY_SECONDS
+
+
+class SubjectAggregate:
+    __slots__ = ('grade_sum', 'grade_count', 'task_count', 'is_terror_prof')
+
+    def __init__(self, is_terror_prof: int = 0):
+        self.grade_sum = 0.0
+        self.grade_count = 0
+        self.task_count = 0
+        self.is_terror_prof = is_terror_prof
+
+
+class UserFeatures:
+    __slots__ = ('subjects', 'recent_hours', 'last_task_id')
+
+    def __init__(self):
+        self.subjects: Dict[str, SubjectAggregate] = {}
+        self.recent_hours = deque(maxlen=WORKLOAD_WINDOW)
+        self.last_task_id = 0
+
+    def subject(self, subject_code: str) -> SubjectAggregate:
+        agg = self.subjects.get(subject_code)
+        if agg is None:
+            agg = self.subjects[subject_code] = SubjectAggregate()
+        return agg
+
+    def apply_task(self, task_id: int, subject_code: str, hours: Optional[float], grade: Optional[float]):
+        # Tasks already covered by the DB snapshot are ignored
+        if task_id <= self.last_task_id:
+            return
+        self.last_task_id = task_id
+        agg = self.subject(subject_code)
+        agg.task_count += 1
+        if grade is not None:
+            agg.grade_sum += grade
+            agg.grade_count += 1
+        self.recent_hours.append(hours or 0.0)
+
+
+class FeatureStore:
+    def __init__(self, connect: Callable, max_users: int = 10000, connect_async: Optional[Callable] = None):
+        self.connect = connect
+        self.connect_async = connect_async
+        self.max_users = max_users
+        self._users: "OrderedDict[int, UserFeatures]" = OrderedDict()
+        # user_id -> events received while that user is being loaded
+        self._loading: Dict[int, List[tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- Writes ---
+
+    def record_task(self, user_id: int, task_id: int, subject_code: str,
+                    hours: Optional[float], grade: Optional[float]):
+        """Apply a newly inserted task. Call after the insert has been committed."""
+        self._dispatch(user_id, ('task', task_id, subject_code, hours, grade))
+
+    def set_subject(self, user_id: int, subject_code: str, is_terror_prof: int):
+        self._dispatch(user_id, ('subject', subject_code, is_terror_prof))
+
+    def invalidate_user(self, user_id: int):
+        """Drop a user so the next read reloads them from the DB."""
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def _dispatch(self, user_id: int, event: tuple):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is not None:
+                self._apply(user, event)
+            elif user_id in self._loading:
+                self._loading[user_id].append(event)
+            # Otherwise the user isn't cached; the next read loads fresh state
+
+    @staticmethod
+    def _apply(user: UserFeatures, event: tuple):
+        if event[0] == 'task':
+            user.apply_task(*event[1:])
+        else:
+            _, subject_code, is_terror_prof = event
+            user.subject(subject_code).is_terror_prof = int(is_terror_prof)
+
+    # --- Reads ---
+
+    def get_features(self, user_id: int, subject_code: str) -> dict:
+        """Engineered features for a prediction, matching the training definitions."""
+        return self.get_features_many(user_id, [subject_code])[0]
+
+    def get_features_many(self, user_id: int, subject_codes: List[str]) -> List[dict]:
+        """Features for several subjects of one user, resolved under a single lock."""
+        return self._features(self._get_user(user_id), subject_codes)
+
+    async def get_features_many_async(self, user_id: int, subject_codes: List[str]) -> List[dict]:
+        user = self._lookup(user_id)
+        if user is None:
+            try:
+                loaded = (await self._load_users_async(user_id)).get(user_id, UserFeatures())
+            except BaseException:
+                self._abandon(user_id)
+                raise
+            user = self._install(user_id, loaded)
+        return self._features(user, subject_codes)
+
+    def _features(self, user: UserFeatures, subject_codes: List[str]) -> List[dict]:
+        with self._lock:
+            recent = float(sum(user.recent_hours))
+            return [self._subject_features(user.subjects.get(code), recent) for code in subject_codes]
+
+    @staticmethod
+    def _subject_features(agg: Optional[SubjectAggregate], recent: float) -> dict:
+        if agg is None:
+            return {
+                'is_terror_prof': 0,
+                'subject_cumulative_gpa': DEFAULT_GPA,
+                'workload_last_7_days': recent,
+                'assignment_sequence': 1,
+            }
+        avg = agg.grade_sum / agg.grade_count if agg.grade_count else None
+        return {
+            'is_terror_prof': agg.is_terror_prof,
+            'subject_cumulative_gpa': avg if avg is not None else DEFAULT_GPA,
+            'workload_last_7_days': recent,
+            'assignment_sequence': agg.task_count + 1,
+        }
+
+    def _lookup(self, user_id: int) -> Optional[UserFeatures]:
+        """The cached user, or None after registering that a load is starting."""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return user
+            self.misses += 1
+            self._loading.setdefault(user_id, [])
+            return None
+
+    def _abandon(self, user_id: int):
+        with self._lock:
+            self._loading.pop(user_id, None)
+
+    def _get_user(self, user_id: int) -> UserFeatures:
+        user = self._lookup(user_id)
+        if user is not None:
+            return user
+        try:
+            loaded = self._load_users(user_id).get(user_id, UserFeatures())
+        except Exception:
+            self._abandon(user_id)
+            raise
+        return self._install(user_id, loaded)
+
+    def _install(self, user_id: int, loaded: UserFeatures) -> UserFeatures:
+        with self._lock:
+            for event in self._loading.pop(user_id, []):
+                self._apply(loaded, event)
+            # Another thread may have finished loading the same user first
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = loaded
+                self._evict()
+            self._users.move_to_end(user_id)
+            return user
+
+    def _evict(self):
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    # --- Loading ---
+
+    def warm(self):
+        """Load the most recently active users, up to max_users."""
+        users = self._load_users(max_users=self.max_users)
+        ordered = sorted(users.items(), key=lambda item: item[1].last_task_id)
+        with self._lock:
+            for user_id, user in ordered[-self.max_users:]:
+                self._users[user_id] = user
+        print(f"Feature store warmed with {len(self._users)} users")
+
+    @staticmethod
+    def _queries(user_id: Optional[int], max_users: Optional[int] = None) -> List[str]:
+        """One user's rows, or every user's, or only the `max_users` with the newest tasks."""
+        scope = ""
+        if user_id is not None:
+            scope = "WHERE t.user_id = %s"
+        elif max_users is not None:
+            # A derived table rather than IN: MySQL rejects LIMIT in IN subqueries
+            scope = f"""
+                JOIN (
+                    SELECT user_id FROM subject_stats
+                    GROUP BY user_id ORDER BY MAX(last_task_id) DESC LIMIT {int(max_users)}
+                ) active ON active.user_id = t.user_id
+            """
+        return [
+            f"SELECT t.user_id, t.subject_code, t.is_terror_prof FROM subjects t {scope}",
+            # Maintained per task insert, so this is one row per (user, subject)
+            f"""
+                SELECT t.user_id, t.subject_code, t.grade_sum, t.grade_count, t.task_count, t.last_task_id
+                FROM subject_stats t {scope}
+            """,
+            f"""
+                SELECT user_id, actual_hours_spent
+                FROM (
+                    SELECT t.user_id, t.task_id, t.actual_hours_spent,
+                           ROW_NUMBER() OVER (PARTITION BY t.user_id ORDER BY t.task_id DESC) AS rn
+                    FROM assignment_logs t {scope}
+                ) recent
+                WHERE rn <= {WORKLOAD_WINDOW}
+                ORDER BY user_id, task_id
+            """,
+        ]
+
+    @staticmethod
+    def _build(subject_rows, stats_rows, recent_rows) -> Dict[int, UserFeatures]:
+        """UserFeatures from the rows of the three _queries, in order."""
+        users: Dict[int, UserFeatures] = {}
+
+        def user_for(uid):
+            user = users.get(uid)
+            if user is None:
+                user = users[uid] = UserFeatures()
+            return user
+
+        for row in subject_rows:
+            user_for(row['user_id']).subject(row['subject_code']).is_terror_prof = int(row['is_terror_prof'] or 0)
+        for row in stats_rows:
+            user = user_for(row['user_id'])
+            agg = user.subject(row['subject_code'])
+            agg.grade_sum = float(row['grade_sum'] or 0.0)
+            agg.grade_count = int(row['grade_count'])
+            agg.task_count = int(row['task_count'])
+            user.last_task_id = max(user.last_task_id, int(row['last_task_id']))
+        for row in recent_rows:
+            user_for(row['user_id']).recent_hours.append(float(row['actual_hours_spent'] or 0.0))
+        return users
+
+    def _load_users(self, user_id: Optional[int] = None, max_users: Optional[int] = None) -> Dict[int, UserFeatures]:
+        params = (user_id,) if user_id is not None else ()
+        query = "feature_store_warm" if user_id is None else "feature_store_load_user"
+        results = []
+        conn = self.connect()
+        with SQL_QUERY_SECONDS.time(query=query):
+            try:
+                cursor = conn.cursor(dictionary=True)
+                for sql in self._queries(user_id, max_users):
+                    cursor.execute(sql, params)
+                    results.append(cursor.fetchall())
+            finally:
+                conn.close()
+        return self._build(*results)
+
+    async def _load_users_async(self, user_id: int) -> Dict[int, UserFeatures]:
+        results = []
+        conn = await self.connect_async()
+        with SQL_QUERY_SECONDS.time(query="feature_store_load_user"):
+            try:
+                cursor = await conn.cursor(dictionary=True)
+                for sql in self._queries(user_id):
+                    await cursor.execute(sql, (user_id,))
+                    results.append(await cursor.fetchall())
+            finally:
+                await conn.close()
+        return self._build(*results)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users_cached": len(self._users),
+                "max_users": self.max_users,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
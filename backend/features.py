@@ -0,0 +1,80 @@
+"""
+Vectorized feature engineering for the duration and grade models.
+
+Every feature is computed with grouped cumulative sums instead of per-row
+pandas slicing. Features are defined per user, the way the feature store
+keeps them for /predict: GPA and sequence per (user, subject), workload
+over the user's own previous tasks, and only tasks before the current row.
+"""
+import numpy as np
+import pandas as pd
+
+from ledger import phase
+
+WORKLOAD_WINDOW = 7
+DEFAULT_GPA = 3.0
+
+ENGINEERED_FEATURES = ['subject_cumulative_gpa', 'workload_last_7_days', 'assignment_sequence']
+
+
+def subject_cumulative_gpa(grades: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Mean grade of the earlier rows in each row's group (a user's subject).
+    NaN grades are skipped; rows with no earlier grade get DEFAULT_GPA, as
+    the feature store serves for a subject with no graded task yet.
+    """
+    grades = np.asarray(grades, dtype=np.float64)
+    valid = ~np.isnan(grades)
+    values = np.where(valid, grades, 0.0)
+    by_group = pd.Series(groups)
+    # Inclusive running totals minus the row itself: only earlier rows count
+    sums = pd.Series(values).groupby(by_group, sort=False).cumsum().to_numpy() - values
+    counts = pd.Series(valid.astype(np.int64)).groupby(by_group, sort=False).cumsum().to_numpy() - valid
+
+    result = np.full(len(grades), DEFAULT_GPA)
+    np.divide(sums, counts, out=result, where=counts > 0)
+    return result
+
+
+def workload_last_n(hours: np.ndarray, groups: np.ndarray, window: int = WORKLOAD_WINDOW) -> np.ndarray:
+    """Sum of hours over the `window` earlier rows of each row's group (a user), the row itself excluded."""
+    hours = np.nan_to_num(np.asarray(hours, dtype=np.float64))
+    n = len(hours)
+    if n == 0:
+        return np.zeros(0)
+    # Lay groups out contiguously (stable, so rows keep their order within a group)
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = pd.Series(np.asarray(groups)[order])
+    # totals[k] is the sum of the first k sorted rows
+    totals = np.concatenate([[0.0], np.cumsum(hours[order])])
+    position = sorted_groups.groupby(sorted_groups, sort=False).cumcount().to_numpy()
+    k = np.arange(n)
+    result = np.empty(n)
+    result[order] = totals[k] - totals[k - np.minimum(position, window)]
+    return result
+
+
+def assignment_sequence(groups: np.ndarray) -> np.ndarray:
+    """1-based position of each row within its group (a user's subject)."""
+    return pd.Series(groups).groupby(pd.Series(groups), sort=False).cumcount().to_numpy() + 1
+
+
+def add_engineered_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sort by task_id and add the engineered feature columns.
+    Expects user_id, subject_code, final_grade_received and actual_hours_spent.
+    Features are per user, exactly as feature_store.py serves them at /predict.
+    """
+    with phase('sort'):
+        df = df.sort_values('task_id', kind='stable').reset_index(drop=True)
+        user_codes, _ = pd.factorize(df['user_id'])
+        subject_codes = df.groupby(['user_id', 'subject_code'], sort=False, observed=True).ngroup().to_numpy()
+
+    with phase('feature_subject_cumulative_gpa'):
+        df['subject_cumulative_gpa'] = subject_cumulative_gpa(
+            df['final_grade_received'].to_numpy(dtype=np.float64), subject_codes)
+    with phase('feature_workload_last_7_days'):
+        df['workload_last_7_days'] = workload_last_n(df['actual_hours_spent'].to_numpy(dtype=np.float64), user_codes)
+    with phase('feature_assignment_sequence'):
+        df['assignment_sequence'] = assignment_sequence(subject_codes)
+    return df
@@ -0,0 +1,230 @@
+"""
+Streaming bulk import of task history from CSV or NDJSON.
+
+Rows are read incrementally, validated against TaskCreate, and inserted in
+batches of `batch_size` rows, one transaction per batch (including the
+matching subject_stats and task_weekly_stats updates). If a batch is
+rejected by the database it is retried row by row so each bad row gets its
+own error. The caller triggers a single retrain once the import completes.
+
+A row may carry an ISO 8601 `completed_at` date or timestamp. It becomes
+the task's created_at and decides which dashboard week the task counts in.
+`created_at` is accepted under its own name too, so an export re-imports
+into the same weeks. Rows without it are stamped with the import time.
+
+CLI usage (from backend/):
+    python importer.py history.csv --user-id 1
+    python importer.py history.ndjson --user-id 1 --batch-size 1000 --no-retrain
+"""
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+import dashboard
+import subject_stats
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Per-row errors beyond this are counted but not listed in the report
+MAX_REPORTED_ERRORS = 100
+
+TASK_COLUMNS = [
+    'subject_code', 'assignment_name', 'task_category', 'difficulty_rating',
+    'days_to_deadline', 'predicted_hours', 'actual_hours_spent',
+    'days_started_before_deadline', 'final_grade_received',
+]
+GRADE_INDEX = TASK_COLUMNS.index('final_grade_received')
+CATEGORY_INDEX = TASK_COLUMNS.index('task_category')
+HOURS_INDEX = TASK_COLUMNS.index('actual_hours_spent')
+# Batch values are the TASK_COLUMNS followed by the parsed completed_at (or None)
+COMPLETED_INDEX = len(TASK_COLUMNS)
+COMPLETED_FIELDS = ('completed_at', 'created_at')
+
+INSERT_TASK = f"""
+    INSERT INTO assignment_logs (user_id, {', '.join(TASK_COLUMNS)}, created_at)
+    VALUES ({', '.join(['%s'] * (len(TASK_COLUMNS) + 1))}, COALESCE(%s, CURRENT_TIMESTAMP))
+"""
+
+INSERT_SUBJECT = """
+    INSERT IGNORE INTO subjects (subject_code, subject_name, is_terror_prof, user_id)
+    VALUES (%s, %s, 0, %s)
+"""
+
+
+def detect_format(filename: Optional[str], fmt: Optional[str] = None) -> str:
+    if fmt:
+        fmt = fmt.lower()
+    elif filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        fmt = 'ndjson'
+    else:
+        fmt = 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f"Unsupported import format: {fmt}")
+    return fmt
+
+
+def read_records(stream, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row number, record, parse error) from a binary stream without loading it whole."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            for row_no, row in enumerate(csv.DictReader(text), start=1):
+                # Empty cells mean "not provided" so optional fields keep their defaults
+                yield row_no, {k: v for k, v in row.items() if k and v not in (None, '')}, None
+        else:
+            for row_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield row_no, None, f"Invalid JSON: {e}"
+                    continue
+                if not isinstance(record, dict):
+                    yield row_no, None, "Expected a JSON object"
+                    continue
+                yield row_no, record, None
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, row_no: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_no, "error": error})
+
+    def to_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def parse_completed_at(record: dict) -> Optional[str]:
+    """A record's completed_at (or created_at) as a naive UTC 'YYYY-MM-DD HH:MM:SS', or None."""
+    value = next((record[f] for f in COMPLETED_FIELDS if record.get(f) not in (None, '')), None)
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"completed_at: not an ISO 8601 date or timestamp: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _validation_message(err: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in err.errors())
+
+
+def _insert_batch(conn, user_id: int, batch: List[Tuple[int, tuple]], report: ImportReport):
+    cursor = conn.cursor()
+    subjects = sorted({values[0] for _, values in batch})
+    try:
+        cursor.executemany(INSERT_SUBJECT, [(code, code, user_id) for code in subjects])
+        # mysql-connector rewrites executemany INSERTs into one multi-row statement
+        cursor.executemany(INSERT_TASK, [(user_id,) + values for _, values in batch])
+        subject_stats.record_batch(cursor, user_id, [(values[0], values[GRADE_INDEX]) for _, values in batch])
+        dashboard.record_batch(cursor, user_id, [(values[0], values[CATEGORY_INDEX], values[HOURS_INDEX],
+                                                  values[GRADE_INDEX], values[COMPLETED_INDEX])
+                                                 for _, values in batch])
+        conn.commit()
+        report.inserted += len(batch)
+        report.batches += 1
+        return
+    except Exception as e:
+        conn.rollback()
+        print(f"Import batch rejected, retrying row by row: {e}")
+
+    for row_no, values in batch:
+        try:
+            cursor.execute(INSERT_SUBJECT, (values[0], values[0], user_id))
+            cursor.execute(INSERT_TASK, (user_id,) + values)
+            subject_stats.record_task(cursor, user_id, values[0], cursor.lastrowid, values[GRADE_INDEX])
+            dashboard.record_task(cursor, user_id, values[0], values[CATEGORY_INDEX], values[HOURS_INDEX],
+                                  values[GRADE_INDEX], values[COMPLETED_INDEX])
+            conn.commit()
+            report.inserted += 1
+        except Exception as e:
+            conn.rollback()
+            report.add_error(row_no, str(e))
+    report.batches += 1
+
+
+def import_tasks(connect: Callable, user_id: int, stream, fmt: str, schema: type,
+                 batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Validate and insert every record in `stream` for `user_id`."""
+    return import_records(connect, user_id, read_records(stream, fmt), schema, batch_size)
+
+
+def import_records(connect: Callable, user_id: int, records: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+                   schema: type, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Validate and insert (row number, record, parse error) tuples in bounded batches."""
+    report = ImportReport()
+    batch: List[Tuple[int, tuple]] = []
+    conn = connect()
+    try:
+        for row_no, record, error in records:
+            if error:
+                report.add_error(row_no, error)
+                continue
+            try:
+                task: BaseModel = schema(**record)
+                completed_at = parse_completed_at(record)
+            except ValidationError as e:
+                report.add_error(row_no, _validation_message(e))
+                continue
+            except ValueError as e:
+                report.add_error(row_no, str(e))
+                continue
+            batch.append((row_no, tuple(getattr(task, col) for col in TASK_COLUMNS) + (completed_at,)))
+            if len(batch) >= batch_size:
+                _insert_batch(conn, user_id, batch, report)
+                batch = []
+        if batch:
+            _insert_batch(conn, user_id, batch, report)
+    finally:
+        conn.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import tasks from CSV or NDJSON")
+    parser.add_argument('path', help='CSV or NDJSON file')
+    parser.add_argument('--user-id', type=int, required=True, help='Owner of the imported tasks')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--no-retrain', action='store_true', help='Skip the retrain after importing')
+    args = parser.parse_args()
+
+    # Imported here so the module stays usable without the app's import-time setup
+    from main import TaskCreate, get_db_connection, train_models
+
+    with open(args.path, 'rb') as f:
+        report = import_tasks(get_db_connection, args.user_id, f, detect_format(args.path, args.format),
+                              TaskCreate, batch_size=args.batch_size)
+    print(json.dumps(report.to_dict(), indent=2))
+
+    if report.inserted and not args.no_retrain:
+        train_models()
+
+
+if __name__ == '__main__':
+    main()
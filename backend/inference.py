@@ -0,0 +1,101 @@
+"""
+Low-latency inference for trained random forests.
+
+`CompiledForest` flattens every tree of a fitted RandomForestRegressor into
+contiguous NumPy node arrays (feature, threshold, children, value) and walks
+all trees for all rows at once, level by level. There is no joblib dispatch
+and no sklearn input validation, which dominate the cost of single-row and
+small-batch predictions. Results match sklearn's own predict bit for bit,
+given its sequential summation order.
+"""
+import numpy as np
+
+
+class CompiledForest:
+    __slots__ = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'max_depth', 'n_features')
+
+    def __init__(self, forest):
+        trees = [est.tree_ for est in forest.estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            is_leaf = tree.children_left == -1
+            own = np.arange(tree.node_count) + offset
+            # Leaves point at themselves so extra traversal steps are no-ops
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            values.append(tree.value.reshape(tree.node_count, -1)[:, 0])
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.left = np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp)
+        self.right = np.ascontiguousarray(np.concatenate(rights), dtype=np.intp)
+        self.value = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        self.roots = np.asarray(offsets, dtype=np.intp)
+        self.max_depth = max(t.max_depth for t in trees)
+        self.n_features = forest.n_features_in_
+
+    @classmethod
+    def supports(cls, model) -> bool:
+        estimators = getattr(model, 'estimators_', None)
+        return (
+            estimators is not None
+            and len(estimators) > 0
+            and all(hasattr(est, 'tree_') for est in estimators)
+            and getattr(model, 'n_outputs_', 1) == 1
+        )
+
+    def predict(self, X) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = X.shape[0]
+        rows = np.arange(n_rows)[:, None]
+
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Sum trees in order, then divide, exactly as RandomForestRegressor does
+        leaf_values = self.value[nodes]
+        total = np.zeros(n_rows)
+        for t in range(leaf_values.shape[1]):
+            total += leaf_values[:, t]
+        total /= leaf_values.shape[1]
+        return total
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ('feature', 'threshold', 'left', 'right', 'value', 'roots'))
+
+
+def compile_models(models: dict) -> dict:
+    """Compiled evaluators for the models in a models dict that support it."""
+    compiled = {}
+    for name in ('duration', 'grade'):
+        model = models.get(f'{name}_model')
+        if model is not None and CompiledForest.supports(model):
+            compiled[name] = CompiledForest(model)
+    return compiled
+
+
+def pin_single_threaded(models: dict):
+    """Evaluate stock models on the calling thread; serving runs one request per thread."""
+    for name in ('duration', 'grade'):
+        model = models.get(f'{name}_model')
+        # Artifacts saved before training moved to its own process were fitted with n_jobs=-1
+        if model is not None and getattr(model, 'n_jobs', None) not in (None, 1):
+            model.n_jobs = 1
+
+
+def predict_with(models: dict, name: str, X) -> np.ndarray:
+    """Predict with the compiled evaluator when there is one, else the stock model."""
+    compiled = models.get('compiled', {}).get(name)
+    if compiled is not None:
+        return compiled.predict(X)
+    return models[f'{name}_model'].predict(X)
@@ -0,0 +1,215 @@
+"""
+Ledger of training runs.
+
+A run is opened with `ledger.run(scope)`. Anything inside it, at any call
+depth on the same thread, can time a step with `phase(name)`; outside a run,
+`phase()` is a no-op, so training code can be instrumented unconditionally.
+Each phase records wall time, process CPU time and the peak RSS increase.
+CPU time is process-wide, so it includes work from the model fitting thread
+pools and from any run happening concurrently on another thread. Phases timed
+in the training worker process (see training_worker.py) are collected there
+with `collecting()` and merged into the run with `add_phases()`.
+
+Finished runs are appended to a JSON-lines file (the newest TRAINING_LEDGER_KEEP
+are kept). A phase is flagged as a regression when its wall time exceeds the
+median of the same phase across recent runs with a similar row count by more
+than TRAINING_REGRESSION_THRESHOLD.
+"""
+import contextvars
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+
+from memory import PeakMemory
+
+TRAINING_LEDGER_KEEP = int(os.getenv("TRAINING_LEDGER_KEEP", "500"))
+# Flag a phase that takes this much longer (as a fraction) than its baseline
+TRAINING_REGRESSION_THRESHOLD = float(os.getenv("TRAINING_REGRESSION_THRESHOLD", "0.5"))
+# ...and at least this many seconds longer, so millisecond phases don't flap
+REGRESSION_MIN_SECONDS = 0.25
+# Runs count as comparable when their row counts are within this ratio
+SIMILAR_ROWS_RATIO = 1.25
+BASELINE_RUNS = 10
+
+_current: contextvars.ContextVar = contextvars.ContextVar("training_run", default=None)
+
+
+class TrainingRun:
+    def __init__(self, scope: str):
+        self.record = {
+            "run_id": uuid.uuid4().hex[:12],
+            "scope": scope,
+            "started_at": time.time(),
+            "outcome": None,
+            "rows": None,
+            "watermark": None,
+            "model_version": None,
+            "phases": [],
+            "params": {},
+            "metrics": {},
+        }
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    def add_phase(self, name: str, wall: float, cpu: float, memory: dict):
+        self.record["phases"].append({
+            "name": name,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "peak_delta_mb": memory["delta_mb"],
+        })
+
+    def add_phases(self, phases: List[dict]):
+        """Phases recorded by another process, as produced by add_phase()."""
+        self.record["phases"].extend(phases)
+
+    def record_models(self, models: dict):
+        """Pull params, backends and metrics out of a freshly built models dict."""
+        tuning = models.get('tuning') or {}
+        for name in ('duration', 'grade'):
+            model = models.get(f'{name}_model')
+            if model is None:
+                continue
+            params = tuning.get(name, {}).get('params')
+            if params is None:
+                params = {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, type(None)))}
+            self.record["params"][name] = {"backend": models.get(f'{name}_backend'), **params}
+            self.record["metrics"][name] = {
+                "r2": models.get(f'{name}_r2'),
+                "mae": models.get(f'{name}_mae'),
+                "source": models.get(f'{name}_metric_source'),
+            }
+
+
+@contextmanager
+def phase(name: str):
+    """Time a step of the current training run (no-op outside a run)."""
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with PeakMemory() as memory:
+            yield
+    finally:
+        run.add_phase(name, time.perf_counter() - wall, time.process_time() - cpu, memory.report())
+
+
+@contextmanager
+def collecting(run: TrainingRun):
+    """Make `run` the current run for phase() without writing it to a ledger."""
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
+
+
+class TrainingLedger:
+    def __init__(self, path: str, keep: int = TRAINING_LEDGER_KEEP):
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._appended = 0
+
+    @contextmanager
+    def run(self, scope: str):
+        """Record a training run. The run's outcome defaults to 'failed' if the block raises."""
+        run = TrainingRun(scope)
+        token = _current.set(run)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            with PeakMemory() as memory:
+                yield run
+        except BaseException:
+            run.set(outcome="failed")
+            raise
+        finally:
+            _current.reset(token)
+            run.set(
+                outcome=run.record["outcome"] or "success",
+                wall_s=round(time.perf_counter() - wall, 4),
+                cpu_s=round(time.process_time() - cpu, 4),
+                memory=memory.report(),
+            )
+            try:
+                self._append(run.record)
+            except Exception as e:
+                print(f"Recording training run failed: {e}")
+
+    def _append(self, record: dict):
+        with self._lock:
+            record["regressions"] = find_regressions(record, self.recent(BASELINE_RUNS * 5, scope=record["scope"]))
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+            self._appended += 1
+            if self._appended % 50 == 0:
+                self._compact()
+
+    def _compact(self):
+        runs = self._read_all()
+        if len(runs) > self.keep:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                for record in runs[-self.keep:]:
+                    f.write(json.dumps(record, default=str) + "\n")
+            os.replace(tmp_path, self.path)
+
+    def _read_all(self) -> List[dict]:
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        runs = []
+        for line in lines:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue  # A torn write; skip it
+        return runs
+
+    def recent(self, limit: int = 20, scope: Optional[str] = None) -> List[dict]:
+        """Newest runs first, optionally for one scope ('global' or 'user:<id>')."""
+        runs = self._read_all()
+        if scope is not None:
+            runs = [run for run in runs if run.get("scope") == scope]
+        return runs[::-1][:limit]
+
+
+def _similar_rows(a: Optional[int], b: Optional[int]) -> bool:
+    if not a or not b:
+        return False
+    return max(a, b) / min(a, b) <= SIMILAR_ROWS_RATIO
+
+
+def find_regressions(record: dict, history: List[dict],
+                     threshold: float = TRAINING_REGRESSION_THRESHOLD) -> List[dict]:
+    """Phases of `record` that are slower than their median over comparable successful runs."""
+    comparable = [run for run in history
+                  if run.get("outcome") == "success" and _similar_rows(run.get("rows"), record.get("rows"))]
+    comparable = comparable[:BASELINE_RUNS]
+    flagged = []
+    for current in record.get("phases", []):
+        past = [p["wall_s"] for run in comparable for p in run.get("phases", []) if p["name"] == current["name"]]
+        if not past:
+            continue
+        baseline = statistics.median(past)
+        slower = current["wall_s"] - baseline
+        if slower > REGRESSION_MIN_SECONDS and current["wall_s"] > baseline * (1 + threshold):
+            flagged.append({
+                "phase": current["name"],
+                "wall_s": current["wall_s"],
+                "baseline_s": round(baseline, 4),
+                "ratio": round(current["wall_s"] / baseline, 2) if baseline else None,
+                "compared_runs": len(comparable),
+            })
+    return flagged
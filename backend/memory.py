@@ -0,0 +1,77 @@
+"""
+Process memory measurement for training runs.
+
+`PeakMemory` samples resident set size on a background thread while a block
+runs and reports the peak above the starting point. RSS comes from
+/proc/self/statm where available; elsewhere only the lifetime peak from
+getrusage() is known, so the reported delta is an upper bound.
+"""
+import os
+import resource
+import sys
+import threading
+from typing import Optional
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_STATM = "/proc/self/statm"
+
+
+def rss_bytes() -> int:
+    """Current resident set size."""
+    try:
+        with open(_STATM) as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return max_rss_bytes()
+
+
+def max_rss_bytes() -> int:
+    """Peak resident set size over the life of the process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakMemory:
+    """
+    with PeakMemory() as mem:
+        ...
+    mem.report() -> {'start_mb', 'peak_mb', 'delta_mb'}
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        current = rss_bytes()
+        if current > self.peak:
+            self.peak = current
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakMemory":
+        self.start = self.peak = rss_bytes()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="peak-memory", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+    def report(self) -> dict:
+        mb = 1024 * 1024
+        return {
+            "start_mb": round(self.start / mb, 1),
+            "peak_mb": round(self.peak / mb, 1),
+            "delta_mb": round((self.peak - self.start) / mb, 1),
+        }
@@ -2,6 +2,8 @@
 -- FYI Dashboard: User Authentication Migration
 -- ============================================
 -- Run each section separately in MySQL Workbench
+-- NOTE: The backend now applies these changes automatically on startup
+-- (see migrations.py). This script is kept for manual setups.
 
 -- Step 1: Create users table
 CREATE TABLE IF NOT EXISTS users (
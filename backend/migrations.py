@@ -0,0 +1,262 @@
+"""
+Versioned schema migrations.
+
+Migrations run in order on startup and each applied version is recorded in
+`schema_migrations`. MySQL commits DDL implicitly, so every step checks the
+current schema first and is safe to rerun if a migration was interrupted.
+
+Statements are written for MySQL and translated for SQLite by storage.py;
+schema introspection and changes SQLite's ALTER TABLE can't express branch
+on the cursor's dialect.
+"""
+from typing import Callable, List, Tuple
+
+
+def _dialect(cursor) -> str:
+    return getattr(cursor, 'dialect', 'mysql')
+
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    if _dialect(cursor) == 'sqlite':
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def _index_exists(cursor, table: str, index: str) -> bool:
+    if _dialect(cursor) == 'sqlite':
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                       (table, index))
+        return cursor.fetchone()[0] > 0
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def _primary_key_columns(cursor, table: str) -> List[str]:
+    if _dialect(cursor) == 'sqlite':
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [row[1] for row in sorted(cursor.fetchall(), key=lambda row: row[5]) if row[5] > 0]
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'PRIMARY'
+        ORDER BY SEQ_IN_INDEX
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _create_index(cursor, table: str, index: str, columns: str):
+    if not _index_exists(cursor, table, index):
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+
+def m001_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            name VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS subjects (
+            subject_code VARCHAR(10) PRIMARY KEY,
+            subject_name VARCHAR(100),
+            is_terror_prof TINYINT(1) DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assignment_logs (
+            task_id INT AUTO_INCREMENT PRIMARY KEY,
+            subject_code VARCHAR(10),
+            assignment_name VARCHAR(100),
+            task_category VARCHAR(50),
+            difficulty_rating INT,
+            days_to_deadline INT,
+            predicted_hours FLOAT,
+            actual_hours_spent FLOAT,
+            days_started_before_deadline INT,
+            final_grade_received FLOAT
+        )
+    """)
+
+
+def m002_user_ownership(cursor):
+    """Databases created before authentication have no user_id columns."""
+    if not _column_exists(cursor, 'assignment_logs', 'user_id'):
+        cursor.execute("ALTER TABLE assignment_logs ADD COLUMN user_id INT DEFAULT 1 AFTER task_id")
+    if not _column_exists(cursor, 'subjects', 'user_id'):
+        cursor.execute("ALTER TABLE subjects ADD COLUMN user_id INT DEFAULT 1 AFTER subject_code")
+
+
+def m003_per_user_subject_key(cursor):
+    """Subjects are owned per user, so the key has to be (user_id, subject_code)."""
+    if _primary_key_columns(cursor, 'subjects') != ['user_id', 'subject_code']:
+        cursor.execute("UPDATE subjects SET user_id = 1 WHERE user_id IS NULL")
+        if _dialect(cursor) == 'sqlite':
+            # SQLite can't change a primary key in place, so rebuild the table
+            cursor.execute("""
+                CREATE TABLE subjects_rekeyed (
+                    subject_code VARCHAR(10) NOT NULL,
+                    user_id INT NOT NULL DEFAULT 1,
+                    subject_name VARCHAR(100),
+                    is_terror_prof TINYINT(1) DEFAULT 0,
+                    PRIMARY KEY (user_id, subject_code)
+                )
+            """)
+            cursor.execute("""
+                INSERT INTO subjects_rekeyed (subject_code, user_id, subject_name, is_terror_prof)
+                SELECT subject_code, user_id, subject_name, is_terror_prof FROM subjects
+            """)
+            cursor.execute("DROP TABLE subjects")
+            cursor.execute("ALTER TABLE subjects_rekeyed RENAME TO subjects")
+            return
+        cursor.execute("ALTER TABLE subjects MODIFY user_id INT NOT NULL DEFAULT 1")
+        cursor.execute("ALTER TABLE subjects DROP PRIMARY KEY, ADD PRIMARY KEY (user_id, subject_code)")
+
+
+def m004_task_indexes(cursor):
+    # Per-user task listing (InnoDB appends task_id to secondary indexes)
+    _create_index(cursor, 'assignment_logs', 'idx_assignment_user', 'user_id')
+    # Per-subject history and "latest task in subject" lookups
+    _create_index(cursor, 'assignment_logs', 'idx_assignment_user_subject_task', 'user_id, subject_code, task_id')
+
+
+def m005_subject_stats(cursor):
+    """Running per-(user, subject) aggregates, maintained alongside each task insert."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS subject_stats (
+            user_id INT NOT NULL,
+            subject_code VARCHAR(10) NOT NULL,
+            grade_sum DOUBLE NOT NULL DEFAULT 0,
+            grade_count INT NOT NULL DEFAULT 0,
+            task_count INT NOT NULL DEFAULT 0,
+            last_grade FLOAT NULL,
+            last_task_id INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, subject_code)
+        )
+    """)
+    # Backfill from existing history
+    cursor.execute("""
+        INSERT INTO subject_stats (user_id, subject_code, grade_sum, grade_count, task_count, last_grade, last_task_id)
+        SELECT agg.user_id, agg.subject_code, agg.grade_sum, agg.grade_count, agg.task_count,
+               last.final_grade_received, agg.last_task_id
+        FROM (
+            SELECT user_id, subject_code,
+                   COALESCE(SUM(final_grade_received), 0) AS grade_sum,
+                   COUNT(final_grade_received) AS grade_count,
+                   COUNT(*) AS task_count,
+                   MAX(task_id) AS last_task_id
+            FROM assignment_logs
+            WHERE user_id IS NOT NULL AND subject_code IS NOT NULL
+            GROUP BY user_id, subject_code
+        ) agg
+        JOIN assignment_logs last ON last.task_id = agg.last_task_id
+        -- Keeps the JOIN's ON apart from the upsert clause for SQLite's parser
+        WHERE TRUE
+        ON DUPLICATE KEY UPDATE
+            grade_sum = VALUES(grade_sum),
+            grade_count = VALUES(grade_count),
+            task_count = VALUES(task_count),
+            last_grade = VALUES(last_grade),
+            last_task_id = VALUES(last_task_id)
+    """)
+
+
+def m006_task_weekly_stats(cursor):
+    """Per-(user, week, subject, category) aggregates behind /dashboard/summary."""
+    if not _column_exists(cursor, 'assignment_logs', 'created_at'):
+        if _dialect(cursor) == 'sqlite':
+            # SQLite only adds columns with constant defaults; stamp new rows with a trigger
+            cursor.execute("ALTER TABLE assignment_logs ADD COLUMN created_at TIMESTAMP NULL")
+            cursor.execute("UPDATE assignment_logs SET created_at = CURRENT_TIMESTAMP")
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS assignment_logs_created_at
+                AFTER INSERT ON assignment_logs FOR EACH ROW WHEN NEW.created_at IS NULL
+                BEGIN
+                    UPDATE assignment_logs SET created_at = CURRENT_TIMESTAMP WHERE task_id = NEW.task_id;
+                END
+            """)
+        else:
+            # Existing rows take the time of the migration
+            cursor.execute("ALTER TABLE assignment_logs ADD COLUMN created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS task_weekly_stats (
+            user_id INT NOT NULL,
+            week_start DATE NOT NULL,
+            subject_code VARCHAR(10) NOT NULL,
+            task_category VARCHAR(50) NOT NULL DEFAULT '',
+            task_count INT NOT NULL DEFAULT 0,
+            hours_sum DOUBLE NOT NULL DEFAULT 0,
+            grade_sum DOUBLE NOT NULL DEFAULT 0,
+            grade_count INT NOT NULL DEFAULT 0,
+            great_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, week_start, subject_code, task_category)
+        )
+    """)
+    # Backfill from existing history (replaces rather than adds, so a rerun is harmless)
+    cursor.execute("""
+        INSERT INTO task_weekly_stats
+            (user_id, week_start, subject_code, task_category, task_count, hours_sum, grade_sum, grade_count, great_count)
+        SELECT user_id, week_start, subject_code, task_category,
+               COUNT(*), COALESCE(SUM(actual_hours_spent), 0), COALESCE(SUM(final_grade_received), 0),
+               COUNT(final_grade_received), SUM(final_grade_received >= 3.5)  -- dashboard.GREAT_GRADE
+        FROM (
+            SELECT user_id, subject_code, COALESCE(task_category, '') AS task_category,
+                   actual_hours_spent, final_grade_received,
+                   DATE_SUB(DATE(COALESCE(created_at, NOW())), INTERVAL WEEKDAY(COALESCE(created_at, NOW())) DAY) AS week_start
+            FROM assignment_logs
+            WHERE user_id IS NOT NULL AND subject_code IS NOT NULL
+        ) tasks
+        GROUP BY user_id, week_start, subject_code, task_category
+        ON DUPLICATE KEY UPDATE
+            task_count = VALUES(task_count),
+            hours_sum = VALUES(hours_sum),
+            grade_sum = VALUES(grade_sum),
+            grade_count = VALUES(grade_count),
+            great_count = VALUES(great_count)
+    """)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "base tables", m001_base_tables),
+    (2, "user ownership columns", m002_user_ownership),
+    (3, "per-user subject key", m003_per_user_subject_key),
+    (4, "task indexes", m004_task_indexes),
+    (5, "subject_stats aggregates", m005_subject_stats),
+    (6, "task_weekly_stats aggregates", m006_task_weekly_stats),
+]
+
+
+def run_migrations(conn) -> List[int]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+
+    newly_applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"Applying migration {version}: {name}")
+        migrate(cursor)
+        cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+        newly_applied.append(version)
+    return newly_applied
@@ -1,14 +1,9 @@
-import mysql.connector
-import os
+import argparse
+from importer import TASK_COLUMNS, import_records
 
-def populate_historical_data():
-    conn = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="", # Pue MYSQL Workbench Password here
-        database="dlsu_productivity_db"
-    )
-    cursor = conn.cursor()
+def populate_historical_data(user_id: int):
+    # Uses the app's DB settings (DB_HOST, DB_USER, DB_PASSWORD, DB_NAME env vars)
+    from main import TaskCreate, get_db_connection, train_models
 
     data = [
         # CCINFOM (Information Management)
@@ -48,19 +43,17 @@ def populate_historical_data():
         ('CSINTSY', 'Final Exam', 'Theory', 5, 10, 12.0, 15.0, 1, 3.44)
     ]
 
-    query = """
-    INSERT INTO assignment_logs (
-        subject_code, assignment_name, task_category, difficulty_rating, 
-        days_to_deadline, predicted_hours, actual_hours_spent, 
-        days_started_before_deadline, final_grade_received
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
+    records = ((i, dict(zip(TASK_COLUMNS, row)), None) for i, row in enumerate(data, start=1))
+    report = import_records(get_db_connection, user_id, records, TaskCreate)
+    print(f"Successfully inserted {report.inserted} records.")
+    for error in report.errors:
+        print(f"Row {error['row']}: {error['error']}")
 
-    cursor.executemany(query, data)
-    conn.commit()
-    print(f"Successfully inserted {cursor.rowcount} records.")
-    
-    conn.close()
+    if report.inserted:
+        train_models()
 
 if __name__ == "__main__":
-    populate_historical_data()
+    parser = argparse.ArgumentParser(description="Load the sample semester history for one user")
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+    populate_historical_data(args.user_id)
@@ -0,0 +1,127 @@
+"""
+Cached /predict results.
+
+The Predictor page sends the same forecast again and again as a student edits
+a field and changes it back. Feature lookups come from the feature store, but
+each request still evaluates both forests. This cache keeps recent outputs
+keyed on everything they depend on:
+
+    (model scope, model version, user, subject, category, difficulty,
+     days started before, is_terror_prof, subject GPA, 7-day workload,
+     assignment sequence)
+
+so a hit is exactly what the models would return. A retrain changes the
+version and a user's write changes their engineered features, so stale
+entries can never match a key again. Swaps and writes still clear the
+entries they obsolete, so they don't take up room until LRU or the TTL
+evicts them. days_to_deadline is accepted by /predict but isn't a model
+input, so it isn't part of the key.
+
+PREDICTION_CACHE_SIZE=0 turns the cache off.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_SECONDS = float(os.getenv("PREDICTION_CACHE_SECONDS", "600"))
+
+
+def prediction_key(models: dict, user_id: int, item, features: dict) -> tuple:
+    """The cache key for one resolved prediction input."""
+    return (
+        models.get('scope', 'global'), models.get('version'), user_id,
+        item.subject, item.category, item.difficulty, item.days_started_before,
+        features['is_terror_prof'], features['subject_cumulative_gpa'],
+        features['workload_last_7_days'], features['assignment_sequence'],
+    )
+
+
+class PredictionCache:
+    """Bounded LRU of prediction key -> (output dict, stored at), expiring after `max_age` seconds."""
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE, max_age: float = PREDICTION_CACHE_SECONDS):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # user_id -> keys of theirs currently held, for invalidation
+        self._by_user: Dict[int, Set[tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: tuple) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                output, stored_at = entry
+                if now - stored_at < self.max_age:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return output
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, output: dict):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (output, time.monotonic())
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(key[2], set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop a user's entries (their features changed)."""
+        with self._lock:
+            for key in self._by_user.pop(user_id, ()):
+                del self._entries[key]
+                self.invalidations += 1
+
+    def invalidate_models(self, scope: str, keep_version: Optional[Hashable] = None, user_id: Optional[int] = None):
+        """Drop entries from `scope` models (one user's, if given) other than `keep_version`."""
+        with self._lock:
+            stale = [key for key in self._entries
+                     if key[0] == scope and key[1] != keep_version and (user_id is None or key[2] == user_id)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def _remove(self, key: tuple):
+        del self._entries[key]
+        keys = self._by_user.get(key[2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[2]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "max_age_s": self.max_age,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
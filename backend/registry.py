@@ -0,0 +1,228 @@
+"""
+Per-user model registry.
+
+Each user with enough history gets their own models, trained in the
+background and persisted under `<root>/users/<user_id>/`. Up to `max_loaded`
+users' models are held in memory in LRU order; evicted users are reloaded
+from disk on their next request. Until a user's models are ready, `get()`
+returns None and the caller falls back to the global models.
+
+With `training_enabled` off (a worker that isn't the trainer) the registry
+only loads what the trainer has saved: misses are forwarded through
+`forward_fn`, and `reload_changed()` picks up newer versions from disk.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from artifacts import ArtifactStore
+from inference import compile_models, pin_single_threaded
+
+# Users known to lack enough data, remembered so /predict doesn't requeue them
+MAX_COLD_USERS = 100000
+# How long a non-training registry waits before checking disk again for a cold user
+COLD_RETRY_SECONDS = 60.0
+
+
+class ModelRegistry:
+    def __init__(self, root: str, train_fn: Callable[[int, Optional[dict]], Optional[dict]],
+                 watermark_fn: Callable[[int], dict], max_loaded: int = 50, quiet_seconds: float = 5.0,
+                 max_delay_seconds: float = 60.0,
+                 forward_fn: Optional[Callable[[int], None]] = None,
+                 on_install: Optional[Callable[[int, dict], None]] = None):
+        self.root = root
+        self.train_fn = train_fn
+        self.watermark_fn = watermark_fn
+        self.forward_fn = forward_fn
+        # Called with (user_id, models) once a new set is serving
+        self.on_install = on_install
+        self.training_enabled = True
+        self.max_loaded = max_loaded
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._loaded: "OrderedDict[int, dict]" = OrderedDict()
+        self._cold: "OrderedDict[int, float]" = OrderedDict()  # user_id -> monotonic time marked
+        self._pending: Dict[int, float] = {}  # user_id -> monotonic due time
+        self._pending_since: Dict[int, float] = {}  # user_id -> first retrain request behind that due time
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.trained = 0
+        self.loaded_from_disk = 0
+
+    def store_for(self, user_id: int) -> ArtifactStore:
+        return ArtifactStore(os.path.join(self.root, "users", str(user_id)), keep=1)
+
+    # --- Serving ---
+
+    def get(self, user_id: int) -> Optional[dict]:
+        """The user's models if they are in memory; otherwise queue a load and return None."""
+        with self._cond:
+            models = self._loaded.get(user_id)
+            if models is not None:
+                self._loaded.move_to_end(user_id)
+                self.hits += 1
+                return models
+            self.misses += 1
+            if not self._is_cold(user_id) and user_id not in self._pending:
+                self._pending[user_id] = time.monotonic()
+                self._cond.notify_all()
+            return None
+
+    def request_retrain(self, user_id: int):
+        """Retrain a user's models after the quiet window, at most max_delay_seconds after the first write."""
+        with self._cond:
+            self._cold.pop(user_id, None)
+            now = time.monotonic()
+            since = self._pending_since.setdefault(user_id, now)
+            self._pending[user_id] = min(now + self.quiet_seconds, since + self.max_delay_seconds)
+            self._cond.notify_all()
+
+    def _is_cold(self, user_id: int) -> bool:
+        marked = self._cold.get(user_id)
+        if marked is None:
+            return False
+        # Writes clear a trainer's cold entries; elsewhere they expire so disk gets rechecked
+        return self.training_enabled or time.monotonic() - marked < COLD_RETRY_SECONDS
+
+    def _install(self, user_id: int, models: dict, version: int):
+        pin_single_threaded(models)
+        try:
+            models['compiled'] = compile_models(models)
+        except Exception as e:
+            print(f"Compiling models for user {user_id} failed: {e}")
+            models['compiled'] = {}
+        models['version'] = version
+        models['scope'] = 'user'
+        with self._cond:
+            self._cold.pop(user_id, None)
+            self._loaded[user_id] = models
+            self._loaded.move_to_end(user_id)
+            while len(self._loaded) > self.max_loaded:
+                # Already persisted, so eviction only frees memory
+                self._loaded.popitem(last=False)
+                self.evictions += 1
+        if self.on_install is not None:
+            self.on_install(user_id, models)
+
+    def _mark_cold(self, user_id: int):
+        with self._cond:
+            self._cold[user_id] = time.monotonic()
+            self._cold.move_to_end(user_id)
+            while len(self._cold) > MAX_COLD_USERS:
+                self._cold.popitem(last=False)
+
+    # --- Background worker ---
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="user-model-registry", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                user_id = None
+                while not self._stopped:
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    user_id, due = min(self._pending.items(), key=lambda item: item[1])
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        del self._pending[user_id]
+                        self._pending_since.pop(user_id, None)
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+            try:
+                self.refresh(user_id)
+            except Exception as e:
+                print(f"Refreshing models for user {user_id} failed: {e}")
+
+    def refresh(self, user_id: int):
+        """Load the user's saved models if current, else train (or mark them cold)."""
+        store = self.store_for(user_id)
+        if not self.training_enabled:
+            self._load_published(user_id, store)
+            return
+        watermark = self.watermark_fn(user_id)
+        loaded = store.load_latest()
+        if loaded is not None and loaded[1]['watermark'] == watermark:
+            models, manifest = loaded
+            self._install(user_id, models, manifest['version'])
+            with self._cond:
+                self.loaded_from_disk += 1
+            return
+
+        previous_tuning = loaded[0].get('tuning') if loaded is not None else None
+        models = self.train_fn(user_id, previous_tuning)
+        if models is None:
+            self._mark_cold(user_id)
+            return
+        version = (store.versions() or [0])[0] + 1
+        store.save(models, version, watermark)
+        self._install(user_id, models, version)
+        with self._cond:
+            self.trained += 1
+        print(f"Trained models for user {user_id} (version {version})")
+
+    def _load_published(self, user_id: int, store: ArtifactStore):
+        loaded = store.load_latest()
+        if loaded is not None:
+            models, manifest = loaded
+            self._install(user_id, models, manifest['version'])
+            with self._cond:
+                self.loaded_from_disk += 1
+            return
+        with self._cond:
+            first_miss = user_id not in self._cold
+        if first_miss and self.forward_fn is not None:
+            # Let the trainer decide whether this user has enough data
+            self.forward_fn(user_id)
+        self._mark_cold(user_id)
+
+    def reload_changed(self):
+        """Swap in newer versions the trainer published for users held in memory."""
+        with self._cond:
+            loaded = [(user_id, models['version']) for user_id, models in self._loaded.items()]
+        for user_id, current in loaded:
+            store = self.store_for(user_id)
+            version = store.latest_version()
+            if version is None or version <= current:
+                continue
+            result = store.load(version)
+            if result is not None:
+                self._install(user_id, result[0], version)
+                with self._cond:
+                    self.loaded_from_disk += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "loaded": len(self._loaded),
+                "max_loaded": self.max_loaded,
+                "pending": len(self._pending),
+                "cold_users": len(self._cold),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "trained": self.trained,
+                "loaded_from_disk": self.loaded_from_disk,
+            }
@@ -0,0 +1,103 @@
+"""
+Background retraining scheduler.
+
+Write routes call `request_retrain()` instead of training inline. Requests that
+arrive within the quiet window are merged into a single training run, which
+executes on a daemon thread so the HTTP response is not blocked. Each request
+pushes the run back, but never past `max_delay_seconds` after the first
+request still pending, so a steady stream of writes can't starve retraining.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+
+class RetrainScheduler:
+    """Debounces retrain requests and runs the training function in the background."""
+
+    def __init__(self, train_fn: Callable[[], bool], quiet_seconds: float = 5.0, max_delay_seconds: float = 60.0):
+        self.train_fn = train_fn
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._cond = threading.Condition()
+        self._deadline: Optional[float] = None
+        # When the oldest request behind the pending deadline arrived
+        self._pending_since: Optional[float] = None
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.is_training = False
+        self.requests_received = 0
+        self.runs_completed = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_seconds: Optional[float] = None
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="retrain-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker thread. A run already in progress is allowed to finish."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def request_retrain(self):
+        """Schedule a retrain after the quiet window, pushing back any pending one (up to the max delay)."""
+        with self._cond:
+            self.requests_received += 1
+            now = time.monotonic()
+            if self._pending_since is None:
+                self._pending_since = now
+            self._deadline = min(now + self.quiet_seconds, self._pending_since + self.max_delay_seconds)
+            self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "pending": self._deadline is not None,
+                "is_training": self.is_training,
+                "quiet_seconds": self.quiet_seconds,
+                "max_delay_seconds": self.max_delay_seconds,
+                "requests_received": self.requests_received,
+                "runs_completed": self.runs_completed,
+                "last_run_at": self.last_run_at,
+                "last_run_seconds": self.last_run_seconds,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._deadline is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+                # Requests arriving while we train set a fresh deadline,
+                # which results in exactly one follow-up run.
+                self._deadline = None
+                self._pending_since = None
+                self.is_training = True
+
+            started = time.monotonic()
+            try:
+                self.train_fn()
+            except Exception as e:
+                print(f"Background retrain failed: {e}")
+            finally:
+                with self._cond:
+                    self.is_training = False
+                    self.runs_completed += 1
+                    self.last_run_at = time.time()
+                    self.last_run_seconds = time.monotonic() - started
@@ -0,0 +1,111 @@
+"""
+Cost-aware choice among hyperparameter search candidates.
+
+With MODEL_SELECTION=cost, a search no longer refits its top scorer. The top
+candidates (up to MAX_SHORTLIST) whose CV R² is within SELECTION_R2_TOLERANCE
+of the best are fitted on the full data. Each one's single-row predict
+latency is measured the way /predict evaluates it (compiled where possible),
+along with its pickled size. The fastest candidate within PREDICT_SLO_MS (p99) wins, with size breaking
+ties. If none meets the SLO, the fastest one is used and the miss is recorded.
+"""
+import os
+import pickle
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import clone
+
+from inference import CompiledForest
+
+# "accuracy" (highest CV score) or "cost" (cheapest within tolerance)
+MODEL_SELECTION = os.getenv("MODEL_SELECTION", "accuracy")
+SELECTION_R2_TOLERANCE = float(os.getenv("SELECTION_R2_TOLERANCE", "0.01"))
+# p99 single-row predict budget per model; 0 means no SLO
+PREDICT_SLO_MS = float(os.getenv("PREDICT_SLO_MS", "0"))
+
+# Shortlisted models are all held in memory while they are timed
+MAX_SHORTLIST = 8
+
+LATENCY_WARMUP = 20
+# Candidates are timed round-robin so drift on the machine hits all of them alike
+LATENCY_ROUNDS = 5
+LATENCY_CALLS_PER_ROUND = 40
+
+
+def _serving_predict(estimator):
+    return CompiledForest(estimator).predict if CompiledForest.supports(estimator) else estimator.predict
+
+
+def measure_costs(estimators: list, X_row: np.ndarray) -> List[dict]:
+    """Single-row predict latency (p50/p99, microseconds) and pickled size of each fitted model."""
+    predicts = [_serving_predict(estimator) for estimator in estimators]
+    for predict in predicts:
+        for _ in range(LATENCY_WARMUP):
+            predict(X_row)
+    samples: List[List[float]] = [[] for _ in predicts]
+    for _ in range(LATENCY_ROUNDS):
+        for predict, out in zip(predicts, samples):
+            for _ in range(LATENCY_CALLS_PER_ROUND):
+                start = time.perf_counter()
+                predict(X_row)
+                out.append(time.perf_counter() - start)
+    return [{
+        'latency_p50_us': round(float(np.percentile(times, 50)) * 1e6, 1),
+        'latency_p99_us': round(float(np.percentile(times, 99)) * 1e6, 1),
+        'size_mb': round(len(pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6, 3),
+    } for estimator, times in zip(estimators, samples)]
+
+
+def _final_candidates(cv_results: dict) -> List[Tuple[dict, float]]:
+    """(params, mean CV score) per candidate; for successive halving, only the last round."""
+    scores = np.asarray(cv_results['mean_test_score'], dtype=float)
+    indices = np.arange(len(scores))
+    if 'iter' in cv_results:
+        rounds = np.asarray(cv_results['iter'])
+        indices = indices[rounds == rounds.max()]
+    return [(cv_results['params'][i], float(scores[i])) for i in indices if np.isfinite(scores[i])]
+
+
+def select_by_cost(estimator, cv_results: dict, X, y,
+                   tolerance: float = SELECTION_R2_TOLERANCE,
+                   slo_ms: float = PREDICT_SLO_MS) -> Tuple[object, dict, dict]:
+    """Fit, measure and choose among near-best candidates. Returns (estimator, params, selection record)."""
+    candidates = sorted(_final_candidates(cv_results), key=lambda c: -c[1])
+    best_score = candidates[0][1]
+    X_row = np.asarray(X[:1], dtype=np.float32)
+
+    shortlist = [(params, score) for params, score in candidates if score >= best_score - tolerance][:MAX_SHORTLIST]
+    fitted = [clone(estimator).set_params(**params).fit(X, y) for params, _ in shortlist]
+    costs = measure_costs(fitted, X_row)
+    measured = [(model, params, score, cost) for model, (params, score), cost in zip(fitted, shortlist, costs)]
+
+    slo_us = slo_ms * 1000 if slo_ms > 0 else None
+    within_slo = [m for m in measured if slo_us is None or m[3]['latency_p99_us'] <= slo_us]
+    pool = within_slo or measured
+    chosen = min(pool, key=lambda m: (m[3]['latency_p50_us'], m[3]['size_mb']))
+    best = measured[0]
+
+    def describe(entry) -> dict:
+        _, params, score, cost = entry
+        return {'params': params, 'cv_r2': round(score, 4), **cost}
+
+    record = {
+        'mode': 'cost',
+        'tolerance': tolerance,
+        'slo_ms': slo_ms or None,
+        'slo_met': bool(within_slo) if slo_us is not None else None,
+        'candidates_measured': len(measured),
+        'chosen': describe(chosen),
+        'most_accurate': describe(best),
+    }
+    return chosen[0], chosen[1], record
+
+
+def selection_summary(record: Optional[dict]) -> Optional[str]:
+    if not record:
+        return None
+    chosen, best = record['chosen'], record['most_accurate']
+    return (f"chose {chosen['params']} (R² {chosen['cv_r2']:.3f}, {chosen['latency_p50_us']:.0f}us, "
+            f"{chosen['size_mb']:.1f} MB) over the most accurate (R² {best['cv_r2']:.3f}, "
+            f"{best['latency_p50_us']:.0f}us, {best['size_mb']:.1f} MB)")
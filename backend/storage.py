@@ -0,0 +1,379 @@
+"""
+Storage backends behind the connection pool.
+
+Routes, migrations and training are written against the mysql-connector API
+(`conn.cursor(dictionary=True)`, %s placeholders, MySQL SQL). DB_BACKEND
+picks where that goes:
+
+    mysql   a MySQL server (DB_HOST, DB_USER, DB_PASSWORD, DB_NAME), the default
+    sqlite  an embedded SQLite file at SQLITE_PATH in WAL mode, for single-node
+            installs, tests and offline benchmarks; no server, no socket
+
+The SQLite backend wraps sqlite3 in the same connection/cursor interface and
+rewrites the MySQL-specific syntax the app uses (placeholders, INSERT IGNORE,
+ON DUPLICATE KEY UPDATE, IF/GREATEST, NOW/CURDATE, DATE_SUB and WEEKDAY).
+Schema differences that can't be rewritten per statement (introspection,
+primary key changes) are handled in migrations.py by checking the cursor's
+`dialect`.
+
+`connect_async()` opens a connection for the async routes. Everything on it
+is a coroutine, as in aiomysql: `cursor = await conn.cursor(dictionary=True)`,
+`await cursor.execute(...)`, `await cursor.fetchall()`, and commit,
+rollback, is_connected and close. MySQL goes through aiomysql, so a query in flight holds no
+thread at all. sqlite3 has no non-blocking mode, so each async SQLite
+connection runs its calls on one dedicated thread (as aiosqlite does),
+outside the request threadpool.
+"""
+import asyncio
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+try:
+    import mysql.connector
+except ImportError:  # Only needed with DB_BACKEND=mysql
+    mysql = None
+
+try:
+    import aiomysql
+except ImportError:  # Only needed for the async routes with DB_BACKEND=mysql
+    aiomysql = None
+
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "app.sqlite3"))
+# How long a SQLite writer waits for another one to commit
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+
+
+class MySQLStorage:
+    dialect = "mysql"
+
+    def __init__(self, host: str, user: str, password: str, database: str):
+        if mysql is None:
+            raise RuntimeError("DB_BACKEND=mysql needs mysql-connector-python installed")
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.errors: Tuple[type, ...] = (mysql.connector.Error,)
+        self.async_errors: Tuple[type, ...] = (aiomysql.MySQLError,) if aiomysql is not None else ()
+
+    def connect(self):
+        return mysql.connector.connect(host=self.host, user=self.user, password=self.password,
+                                       database=self.database)
+
+    async def connect_async(self) -> "AsyncMySQLConnection":
+        if aiomysql is None:
+            raise RuntimeError("The async routes need aiomysql installed with DB_BACKEND=mysql")
+        conn = await aiomysql.connect(host=self.host, user=self.user, password=self.password,
+                                      db=self.database, autocommit=False)
+        return AsyncMySQLConnection(conn)
+
+    def create_database(self):
+        conn = mysql.connector.connect(host=self.host, user=self.user, password=self.password)
+        try:
+            conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+        finally:
+            conn.close()
+
+    def describe(self) -> str:
+        return f"mysql://{self.user}@{self.host}/{self.database}"
+
+
+class AsyncMySQLConnection:
+    """aiomysql connection with the app's cursor(dictionary=...) and is_connected() interface."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def cursor(self, dictionary: bool = False):
+        # aiomysql's cursor() returns an awaitable, not the cursor; its cursors already
+        # await execute/fetch* and are buffered, like the sync routes' cursors
+        return await self._conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor)
+
+    async def commit(self):
+        await self._conn.commit()
+
+    async def rollback(self):
+        await self._conn.rollback()
+
+    async def is_connected(self) -> bool:
+        try:
+            await self._conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        try:
+            await self._conn.ensure_closed()
+        except Exception:
+            self._conn.close()
+
+
+# --- SQLite dialect translation ---
+
+def _split_args(text: str) -> List[str]:
+    """Split a function's argument list on top-level commas."""
+    args, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+
+def _rewrite_calls(sql: str, name: str, rewrite) -> str:
+    """Replace every NAME(args) call (parentheses balanced) with rewrite(args)."""
+    pattern = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    while True:
+        match = pattern.search(sql)
+        if match is None:
+            return sql
+        depth, i = 1, match.end()
+        while depth:
+            depth += {'(': 1, ')': -1}.get(sql[i], 0)
+            i += 1
+        sql = sql[:match.start()] + rewrite(_split_args(sql[match.end():i - 1])) + sql[i:]
+
+
+def _date_sub(args: List[str]) -> str:
+    interval = re.fullmatch(r"INTERVAL\s+(.+)\s+DAY", args[1], re.IGNORECASE | re.DOTALL)
+    if interval is None:
+        raise ValueError(f"Unsupported DATE_SUB interval for SQLite: {args[1]}")
+    return f"DATE({args[0]}, '-' || ({interval.group(1)}) || ' days')"
+
+
+_SIMPLE_REWRITES = [
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.IGNORECASE), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bCURDATE\(\)", re.IGNORECASE), "DATE('now')"),
+    (re.compile(r"\bIF\(", re.IGNORECASE), "IIF("),
+    (re.compile(r"\bGREATEST\(", re.IGNORECASE), "MAX("),
+    (re.compile(r"\bLEAST\(", re.IGNORECASE), "MIN("),
+    # Column placement is a MySQL-only nicety
+    (re.compile(r"\s+AFTER\s+\w+\s*$", re.IGNORECASE), ""),
+]
+_UPSERT = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str) -> str:
+    """MySQL statement as used by this app -> SQLite."""
+    sql = sql.replace("%s", "?")
+    for pattern, replacement in _SIMPLE_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    sql = _rewrite_calls(sql, "WEEKDAY", lambda a: f"((CAST(strftime('%w', {a[0]}) AS INTEGER) + 6) % 7)")
+    sql = _rewrite_calls(sql, "DATE_SUB", _date_sub)
+    parts = _UPSERT.split(sql, maxsplit=1)
+    if len(parts) == 2:
+        # The update half refers to the incoming row as excluded.col instead of VALUES(col)
+        sql = parts[0] + "ON CONFLICT DO UPDATE SET" + _VALUES_REF.sub(r"excluded.\1", parts[1])
+    return sql
+
+
+class SQLiteCursor:
+    dialect = "sqlite"
+
+    def __init__(self, conn: sqlite3.Connection, dictionary: bool):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+        self._columns: Optional[List[str]] = None
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        if self._columns is None:
+            self._columns = [d[0] for d in self._cursor.description]
+        return dict(zip(self._columns, row))
+
+    def execute(self, query: str, params=()):
+        self._columns = None
+        self._cursor.execute(translate(query), tuple(params))
+
+    def executemany(self, query: str, rows):
+        self._columns = None
+        self._cursor.executemany(translate(query), (tuple(row) for row in rows))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path: str, timeout: float = SQLITE_BUSY_TIMEOUT):
+        # Pooled connections are used by one request thread at a time, but not always the same one
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints rather than every commit; safe against corruption in WAL mode
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self, dictionary: bool = False, **_) -> SQLiteCursor:
+        return SQLiteCursor(self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    def is_connected(self) -> bool:
+        try:
+            self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._conn.close()
+
+
+class AsyncSQLiteCursor:
+    """
+    Buffered, like aiomysql's default cursor: a SELECT's rows are read in the
+    same hop to the connection's thread as the statement, so fetching never
+    leaves the event loop.
+    """
+
+    def __init__(self, conn: "AsyncSQLiteConnection", cursor: SQLiteCursor):
+        self._conn = conn
+        self._cursor = cursor
+        self._rows: list = []
+
+    def _execute(self, query: str, params) -> list:
+        self._cursor.execute(query, params)
+        return self._cursor.fetchall() if self._cursor.description is not None else []
+
+    async def execute(self, query: str, params=()):
+        self._rows = await self._conn._run(self._execute, query, params)
+
+    async def executemany(self, query: str, rows):
+        self._rows = []
+        await self._conn._run(self._cursor.executemany, query, list(rows))
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchmany(self, size: int = 1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    async def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+
+class AsyncSQLiteConnection:
+    """A SQLiteConnection driven from its own thread, so awaiting it never blocks the event loop."""
+
+    def __init__(self, executor: ThreadPoolExecutor, conn: SQLiteConnection):
+        self._executor = executor
+        self._conn = conn
+
+    @classmethod
+    async def open(cls, path: str) -> "AsyncSQLiteConnection":
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-async")
+        try:
+            conn = await asyncio.get_running_loop().run_in_executor(executor, SQLiteConnection, path)
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        return cls(executor, conn)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def cursor(self, dictionary: bool = False) -> AsyncSQLiteCursor:
+        return AsyncSQLiteCursor(self, self._conn.cursor(dictionary=dictionary))
+
+    async def commit(self):
+        await self._run(self._conn.commit)
+
+    async def rollback(self):
+        # Reads don't open a transaction, so most pool returns have nothing to undo
+        if self._conn.in_transaction:
+            await self._run(self._conn.rollback)
+
+    async def is_connected(self) -> bool:
+        return await self._run(self._conn.is_connected)
+
+    async def close(self):
+        try:
+            await self._run(self._conn.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+class SQLiteStorage:
+    dialect = "sqlite"
+    errors: Tuple[type, ...] = (sqlite3.Error,)
+    async_errors: Tuple[type, ...] = (sqlite3.Error,)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
+
+    async def connect_async(self) -> AsyncSQLiteConnection:
+        return await AsyncSQLiteConnection.open(self.path)
+
+    def create_database(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def describe(self) -> str:
+        return f"sqlite://{self.path}"
+
+
+def storage_from_env(host: str, user: str, password: str, database: str):
+    if DB_BACKEND == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+    if DB_BACKEND == "mysql":
+        return MySQLStorage(host, user, password, database)
+    raise ValueError(f"Unknown DB_BACKEND {DB_BACKEND!r} (expected mysql or sqlite)")
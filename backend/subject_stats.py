@@ -0,0 +1,62 @@
+"""
+Maintenance of the `subject_stats` summary table.
+
+Call these with the same cursor as the task insert, before committing, so
+the aggregates and the task rows always change in one transaction
+(`record_task_async` for an async cursor).
+"""
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+UPSERT_SUBJECT_STATS = """
+    INSERT INTO subject_stats (user_id, subject_code, grade_sum, grade_count, task_count, last_grade, last_task_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        grade_sum = grade_sum + VALUES(grade_sum),
+        grade_count = grade_count + VALUES(grade_count),
+        task_count = task_count + VALUES(task_count),
+        last_grade = IF(VALUES(last_task_id) >= last_task_id, VALUES(last_grade), last_grade),
+        last_task_id = GREATEST(last_task_id, VALUES(last_task_id))
+"""
+
+# Served by idx_assignment_user_subject_task
+LATEST_TASK_IN_SUBJECT = """
+    SELECT task_id, final_grade_received
+    FROM assignment_logs
+    WHERE user_id = %s AND subject_code = %s
+    ORDER BY task_id DESC
+    LIMIT 1
+"""
+
+
+def _task_row(user_id: int, subject_code: str, task_id: int, grade: Optional[float]) -> tuple:
+    return (user_id, subject_code, grade or 0.0, 1 if grade is not None else 0, 1, grade, task_id)
+
+
+def record_task(cursor, user_id: int, subject_code: str, task_id: int, grade: Optional[float]):
+    """Add one freshly inserted task to its subject's aggregates."""
+    cursor.execute(UPSERT_SUBJECT_STATS, _task_row(user_id, subject_code, task_id, grade))
+
+
+async def record_task_async(cursor, user_id: int, subject_code: str, task_id: int, grade: Optional[float]):
+    await cursor.execute(UPSERT_SUBJECT_STATS, _task_row(user_id, subject_code, task_id, grade))
+
+
+def record_batch(cursor, user_id: int, tasks: Iterable[Tuple[str, Optional[float]]]):
+    """Add a batch of inserted (subject_code, grade) rows, one upsert per subject."""
+    totals: "OrderedDict[str, list]" = OrderedDict()
+    for subject_code, grade in tasks:
+        total = totals.setdefault(subject_code, [0.0, 0, 0])
+        if grade is not None:
+            total[0] += grade
+            total[1] += 1
+        total[2] += 1
+
+    rows = []
+    for subject_code, (grade_sum, grade_count, task_count) in totals.items():
+        # Multi-row inserts don't report every id, so read the newest row back by index
+        cursor.execute(LATEST_TASK_IN_SUBJECT, (user_id, subject_code))
+        last_task_id, last_grade = cursor.fetchone()
+        rows.append((user_id, subject_code, grade_sum, grade_count, task_count, last_grade, last_task_id))
+    if rows:
+        cursor.executemany(UPSERT_SUBJECT_STATS, rows)
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+# Modules live in backend/, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read at import time by main and friends; nothing here connects until a test does
+os.environ.setdefault("ARTIFACT_DIR", tempfile.mkdtemp(prefix="fyi-tests-"))
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    """A migrated SQLite database in a temporary directory."""
+    from migrations import run_migrations
+    from storage import SQLiteStorage
+
+    storage = SQLiteStorage(str(tmp_path / "fyi.db"))
+    conn = storage.connect()
+    try:
+        run_migrations(conn)
+    finally:
+        conn.close()
+    return storage
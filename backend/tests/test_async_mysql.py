@@ -0,0 +1,177 @@
+"""
+The async routes on DB_BACKEND=mysql, against a fake aiomysql connection.
+
+No MySQL server is needed: aiomysql.connect is replaced by a connection that
+hands out cursors the way aiomysql 0.3 does (cursor() returns an awaitable
+_ContextManager, not the cursor) and answers queries from canned rows.
+"""
+import asyncio
+
+import pytest
+
+aiomysql = pytest.importorskip("aiomysql")
+from aiomysql.utils import _ContextManager  # noqa: E402
+
+from storage import AsyncMySQLConnection, MySQLStorage  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection", dictionary: bool):
+        self._conn = conn
+        self.dictionary = dictionary
+        self._rows = []
+        self.lastrowid = None
+        self.rowcount = 0
+        self.description = None
+
+    async def execute(self, query, args=None):
+        self._conn.executed.append((" ".join(query.split()), args))
+        rows = self._conn.answer(query)
+        self._rows = rows if self.dictionary else [tuple(row.values()) for row in rows]
+        self.rowcount = len(rows)
+        self.lastrowid = 42 if query.lstrip().upper().startswith("INSERT") else None
+
+    async def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    async def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+
+class FakeConnection:
+    """Stands in for aiomysql.Connection: `answer(sql)` picks the rows a query returns."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self, *cursors):
+        async def make():
+            return FakeCursor(self, dictionary=aiomysql.DictCursor in cursors)
+        return _ContextManager(make())
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    async def ping(self, reconnect=True):
+        return None
+
+    async def ensure_closed(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def canned(rows_by_table):
+    def answer(sql):
+        for marker, rows in rows_by_table.items():
+            if marker in sql:
+                return [dict(row) for row in rows]
+        return []
+    return answer
+
+
+@pytest.fixture
+def mysql_app(monkeypatch):
+    """main with its async pool on MySQLStorage.connect_async over FakeConnections."""
+    import main
+    from db import AsyncConnectionPool
+
+    connections = []
+    rows = {}
+
+    async def connect(**kwargs):
+        conn = FakeConnection(canned(rows))
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(aiomysql, "connect", connect)
+    storage = MySQLStorage("db.invalid", "app", "secret", "fyi")
+    monkeypatch.setattr(main, "async_db_pool", AsyncConnectionPool(storage.connect_async, size=2, max_overflow=0))
+    return main, connections, rows
+
+
+def auth_headers(user_id: int) -> dict:
+    from auth import create_access_token
+    return {"Authorization": "Bearer " + create_access_token({"user_id": user_id, "email": "a@b.c"})}
+
+
+def test_cursor_awaits_aiomysql_context_manager():
+    raw = FakeConnection(canned({}))
+    # What the bug called execute on
+    assert not hasattr(raw.cursor(aiomysql.Cursor), "execute")
+
+    async def run():
+        conn = AsyncMySQLConnection(raw)
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute("SELECT 1")
+        await conn.commit()
+        assert await conn.is_connected()
+        await conn.close()
+        return cursor
+
+    cursor = asyncio.run(run())
+    assert isinstance(cursor, FakeCursor) and cursor.dictionary
+    assert raw.executed == [("SELECT 1", None)] and raw.commits == 1 and raw.closed
+
+
+def test_get_subjects(mysql_app):
+    from fastapi.testclient import TestClient
+
+    main, connections, rows = mysql_app
+    rows["FROM subjects"] = [{"subject_code": "CSX", "subject_name": "X", "is_terror_prof": 1, "user_id": 7}]
+
+    response = TestClient(main.app).get("/subjects", headers=auth_headers(7))
+
+    assert response.status_code == 200
+    assert response.json() == [{"subject_code": "CSX", "subject_name": "X", "is_terror_prof": 1}]
+    (conn,) = connections
+    assert conn.executed == [("SELECT * FROM subjects WHERE user_id = %s ORDER BY subject_code", (7,))]
+    # Returned to the pool, transaction ended
+    assert main.async_db_pool.stats()["in_use"] == 0 and conn.rollbacks == 1
+
+
+def test_create_task(mysql_app):
+    from fastapi.testclient import TestClient
+
+    main, connections, _ = mysql_app
+    response = TestClient(main.app).post("/tasks", headers=auth_headers(7), json={
+        "subject_code": "CSX", "assignment_name": "Lab 1", "task_category": "Technical",
+        "difficulty_rating": 3, "days_to_deadline": 5, "days_started_before_deadline": 1,
+        "predicted_hours": 2.0, "actual_hours_spent": 3.0, "final_grade_received": 3.5,
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {"message": "Task created", "task_id": 42}
+    (conn,) = connections
+    statements = [sql for sql, _ in conn.executed]
+    assert statements[0].startswith("INSERT IGNORE INTO subjects")
+    assert statements[1].startswith("INSERT INTO assignment_logs")
+    assert any("INTO subject_stats" in sql for sql in statements)
+    assert any("INTO task_weekly_stats" in sql for sql in statements)
+    assert conn.commits == 1
+
+
+def test_feature_store_loads_user(mysql_app):
+    from feature_store import FeatureStore
+
+    main, _, rows = mysql_app
+    rows["FROM subjects"] = [{"user_id": 7, "subject_code": "CSX", "is_terror_prof": 1}]
+    rows["FROM subject_stats"] = [{"user_id": 7, "subject_code": "CSX", "grade_sum": 7.0, "grade_count": 2,
+                                   "task_count": 3, "last_task_id": 9}]
+    rows["FROM assignment_logs"] = [{"user_id": 7, "actual_hours_spent": 2.0},
+                                    {"user_id": 7, "actual_hours_spent": 4.5}]
+    store = FeatureStore(connect=None, connect_async=main.get_async_db_connection)
+
+    (features,) = asyncio.run(store.get_features_many_async(7, ["CSX"]))
+
+    assert features == {"is_terror_prof": 1, "subject_cumulative_gpa": 3.5,
+                        "workload_last_7_days": 6.5, "assignment_sequence": 4}
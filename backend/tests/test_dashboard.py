@@ -0,0 +1,48 @@
+"""Dashboard summary from task_weekly_stats on DB_BACKEND=sqlite."""
+import dashboard
+
+
+def summary_for(storage, user_id: int, tasks, **kwargs) -> dict:
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        dashboard.record_batch(cursor, user_id, tasks)
+        conn.commit()
+        cursor.execute(dashboard.SELECT_WEEKLY_STATS, (user_id,))
+        return dashboard.build_summary(cursor.fetchall(), **kwargs)
+    finally:
+        conn.close()
+
+
+def test_weekly_workload_fills_empty_weeks(sqlite_storage):
+    summary = summary_for(sqlite_storage, 7, [
+        ("CSX", "Technical", 2.0, 3.0, "2025-01-07 09:00:00"),
+        ("CSX", "Technical", 1.5, None, "2025-01-09 09:00:00"),
+        # Nothing in the weeks of Jan 13 and Jan 20
+        ("CSY", "Essay", 4.0, 4.0, "2025-01-30 18:00:00"),
+    ])
+
+    assert summary["weekly_workload"] == [
+        {"week_start": "2025-01-06", "tasks": 2, "hours": 3.5},
+        {"week_start": "2025-01-13", "tasks": 0, "hours": 0.0},
+        {"week_start": "2025-01-20", "tasks": 0, "hours": 0.0},
+        {"week_start": "2025-01-27", "tasks": 1, "hours": 4.0},
+    ]
+    # The GPA trend only has points for weeks with grades
+    assert [point["week_start"] for point in summary["gpa_trend"]["CSX"]] == ["2025-01-06"]
+
+
+def test_weekly_workload_keeps_newest_weeks(sqlite_storage):
+    summary = summary_for(sqlite_storage, 7, [
+        ("CSX", "Technical", 1.0, None, "2024-06-03 09:00:00"),
+        ("CSX", "Technical", 2.0, None, "2025-01-08 09:00:00"),
+    ], weeks=3)
+
+    # The range is counted in calendar weeks back from the newest, not in weeks with tasks
+    assert [week["week_start"] for week in summary["weekly_workload"]] == ["2024-12-23", "2024-12-30", "2025-01-06"]
+    assert [week["tasks"] for week in summary["weekly_workload"]] == [0, 0, 1]
+    assert summary["totals"]["tasks"] == 2
+
+
+def test_no_tasks():
+    assert dashboard.build_summary([])["weekly_workload"] == []
@@ -0,0 +1,77 @@
+"""AsyncConnectionPool slot accounting."""
+import asyncio
+
+import pytest
+
+from db import AsyncConnectionPool
+
+
+class SlowPingConnection:
+    def __init__(self):
+        self.closed = False
+        self.ping_delay = 0.0
+
+    async def is_connected(self):
+        await asyncio.sleep(self.ping_delay)
+        return True
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+def test_cancelled_pre_ping_frees_slot():
+    async def run():
+        opened = []
+
+        async def connect():
+            opened.append(SlowPingConnection())
+            return opened[-1]
+
+        pool = AsyncConnectionPool(connect, size=1, max_overflow=0, timeout=0.5)
+        conn = await pool.acquire()
+        await conn.close()
+        opened[0].ping_delay = 10
+
+        task = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+        assert pool.stats()["open"] == 0 and opened[0].closed
+        # The only slot is free again, so this opens a new connection instead of timing out
+        conn = await pool.acquire()
+        assert conn._conn is opened[1]
+        await conn.close()
+
+    asyncio.run(run())
+
+
+def test_cancelled_pre_ping_hands_slot_to_waiter():
+    async def run():
+        opened = []
+
+        async def connect():
+            opened.append(SlowPingConnection())
+            return opened[-1]
+
+        pool = AsyncConnectionPool(connect, size=1, max_overflow=0, timeout=2)
+        conn = await pool.acquire()
+        await conn.close()
+        opened[0].ping_delay = 10
+
+        pinging = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.05)
+        pinging.cancel()
+
+        conn = await waiting
+        assert pool.stats()["open"] == 1
+        await conn.close()
+
+    asyncio.run(run())
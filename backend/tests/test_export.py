@@ -0,0 +1,94 @@
+"""/tasks/export on DB_BACKEND=sqlite: its own connections, capped concurrency."""
+import gc
+import json
+import threading
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from exporter import ExportStream
+
+
+def auth_headers(user_id: int) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"user_id": user_id, "email": "a@b.c"})}
+
+
+@pytest.fixture
+def export_app(sqlite_storage, monkeypatch):
+    import main
+
+    conn = sqlite_storage.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO assignment_logs (user_id, subject_code, assignment_name, actual_hours_spent) "
+            "VALUES (%s, %s, %s, %s)",
+            [(7, "CSX", f"Lab {i}", 1.5) for i in range(3)] + [(8, "CSY", "Other", 2.0)])
+        conn.commit()
+    finally:
+        conn.close()
+    monkeypatch.setattr(main, "storage", sqlite_storage)
+    monkeypatch.setattr(main, "export_slots", threading.BoundedSemaphore(1))
+    return main
+
+
+def slot_free(main) -> bool:
+    if not main.export_slots.acquire(blocking=False):
+        return False
+    main.export_slots.release()
+    return True
+
+
+def test_export_streams_user_rows(export_app):
+    main = export_app
+    checkouts = main.db_pool.checkouts
+
+    response = TestClient(main.app).get("/tasks/export?fields=assignment_name", headers=auth_headers(7))
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["assignment_name"] for row in rows] == ["Lab 0", "Lab 1", "Lab 2"]
+    # Served without the request pool, and the export slot is back
+    assert main.db_pool.checkouts == checkouts
+    assert slot_free(main)
+
+
+def test_concurrent_exports_beyond_limit_get_503(export_app):
+    main = export_app
+    first = main.export_tasks(format="csv", gzip=False, fields=None, current_user_id=7)
+
+    with pytest.raises(HTTPException) as excinfo:
+        main.export_tasks(format="csv", gzip=False, fields=None, current_user_id=7)
+    assert excinfo.value.status_code == 503
+
+    # Dropped before its body was read, as when the client disconnects first
+    del first
+    gc.collect()
+    assert slot_free(main)
+
+
+def test_export_stream_releases_once():
+    closed = []
+
+    class Conn:
+        def close(self):
+            closed.append("conn")
+
+    class Cursor:
+        description = [("task_id",)]
+
+        def __init__(self):
+            self.rows = [(1,), (2,)]
+
+        def fetchmany(self, size):
+            rows, self.rows = self.rows, []
+            return rows
+
+    stream = ExportStream(Conn(), Cursor(), "ndjson", on_close=lambda: closed.append("slot"))
+    assert b"".join(stream) == b'{"task_id": 1}\n{"task_id": 2}\n'
+    stream.close()
+    del stream
+    gc.collect()
+    assert closed == ["conn", "slot"]
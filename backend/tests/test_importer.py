@@ -0,0 +1,101 @@
+"""Bulk import on DB_BACKEND=sqlite: batches, the row-by-row fallback, and per-row errors."""
+import io
+import json
+
+import pytest
+
+from importer import import_tasks
+
+TASK = {"subject_code": "CSX", "assignment_name": "Lab", "task_category": "Technical", "difficulty_rating": 3,
+        "days_to_deadline": 5, "days_started_before_deadline": 1, "predicted_hours": 2.0,
+        "actual_hours_spent": 3.0, "final_grade_received": 3.5}
+
+
+@pytest.fixture
+def schema():
+    from main import TaskCreate
+    return TaskCreate
+
+
+def ndjson(*records) -> io.BytesIO:
+    return io.BytesIO("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records).encode())
+
+
+def rows(storage, sql: str) -> list:
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        return [tuple(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def reject_assignment(storage, name: str):
+    """Make the database refuse tasks with this name, the way a constraint would."""
+    conn = storage.connect()
+    try:
+        conn.cursor().execute(f"""
+            CREATE TRIGGER reject_task BEFORE INSERT ON assignment_logs
+            WHEN NEW.assignment_name = '{name}'
+            BEGIN SELECT RAISE(ABORT, 'rejected by constraint'); END
+        """)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_clean_import_uses_whole_batches(sqlite_storage, schema):
+    records = [dict(TASK, assignment_name=f"Lab {i}") for i in range(5)]
+
+    report = import_tasks(sqlite_storage.connect, 7, ndjson(*records), "ndjson", schema, batch_size=2)
+
+    assert report.to_dict() == {"inserted": 5, "failed": 0, "batches": 3, "errors": [], "errors_truncated": False}
+    assert rows(sqlite_storage, "SELECT COUNT(*) FROM assignment_logs WHERE user_id = 7") == [(5,)]
+    assert rows(sqlite_storage, "SELECT grade_sum, grade_count, task_count FROM subject_stats") == [(17.5, 5, 5)]
+    assert rows(sqlite_storage, "SELECT SUM(task_count) FROM task_weekly_stats") == [(5,)]
+
+
+def test_rejected_batch_falls_back_to_single_rows(sqlite_storage, schema):
+    reject_assignment(sqlite_storage, "Bad")
+    records = [dict(TASK, assignment_name=name) for name in ("Lab 1", "Bad", "Lab 2", "Lab 3")]
+
+    report = import_tasks(sqlite_storage.connect, 7, ndjson(*records), "ndjson", schema, batch_size=3)
+
+    assert report.inserted == 3 and report.failed == 1 and report.batches == 2
+    assert report.errors == [{"row": 2, "error": "rejected by constraint"}]
+    assert rows(sqlite_storage, "SELECT assignment_name FROM assignment_logs ORDER BY task_id") == \
+        [("Lab 1",), ("Lab 2",), ("Lab 3",)]
+    # The rolled-back batch left no partial aggregates behind
+    assert rows(sqlite_storage, "SELECT grade_count, task_count, last_task_id FROM subject_stats") == [(3, 3, 3)]
+    assert rows(sqlite_storage, "SELECT SUM(task_count), SUM(hours_sum) FROM task_weekly_stats") == [(3, 9.0)]
+
+
+def test_invalid_rows_are_reported_and_skipped(sqlite_storage, schema):
+    report = import_tasks(sqlite_storage.connect, 7, ndjson(
+        TASK,
+        "{not json",
+        "[1, 2]",
+        dict(TASK, difficulty_rating="hard"),
+        dict(TASK, completed_at="last tuesday"),
+        dict(TASK, completed_at="2025-03-05T10:00:00+08:00"),
+    ), "ndjson", schema)
+
+    assert report.inserted == 2 and report.failed == 4
+    assert [error["row"] for error in report.errors] == [2, 3, 4, 5]
+    assert report.errors[0]["error"].startswith("Invalid JSON")
+    assert report.errors[1]["error"] == "Expected a JSON object"
+    assert report.errors[2]["error"].startswith("difficulty_rating:")
+    assert report.errors[3]["error"].startswith("completed_at:")
+    assert rows(sqlite_storage, "SELECT created_at FROM assignment_logs WHERE created_at LIKE '2025%'") == \
+        [("2025-03-05 02:00:00",)]
+
+
+def test_csv_empty_cells_take_defaults(sqlite_storage, schema):
+    header = ",".join(TASK)
+    values = ",".join("" if key == "final_grade_received" else str(value) for key, value in TASK.items())
+
+    report = import_tasks(sqlite_storage.connect, 7, io.BytesIO(f"{header}\n{values}\n".encode()), "csv", schema)
+
+    assert report.inserted == 1
+    assert rows(sqlite_storage, "SELECT final_grade_received FROM assignment_logs") == [(0.0,)]
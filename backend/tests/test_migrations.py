@@ -0,0 +1,95 @@
+"""Migrations m001-m006 on DB_BACKEND=sqlite, from an empty database and from a pre-existing one."""
+import pytest
+
+from migrations import MIGRATIONS, _index_exists, _primary_key_columns, m001_base_tables, run_migrations
+from storage import SQLiteStorage
+
+ALL_VERSIONS = [version for version, _, _ in MIGRATIONS]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = SQLiteStorage(str(tmp_path / "fyi.db")).connect()
+    yield conn
+    conn.close()
+
+
+def tables(conn) -> set:
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def rows(conn, sql: str) -> list:
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def assert_current_schema(conn):
+    cursor = conn.cursor()
+    assert {"users", "subjects", "assignment_logs", "subject_stats", "task_weekly_stats",
+            "schema_migrations"} <= tables(conn)
+    assert _primary_key_columns(cursor, "subjects") == ["user_id", "subject_code"]
+    assert _index_exists(cursor, "assignment_logs", "idx_assignment_user")
+    assert _index_exists(cursor, "assignment_logs", "idx_assignment_user_subject_task")
+    assert rows(conn, "SELECT version FROM schema_migrations ORDER BY version") == [(v,) for v in ALL_VERSIONS]
+
+
+def test_empty_database(conn):
+    assert run_migrations(conn) == ALL_VERSIONS
+    assert_current_schema(conn)
+    # Already current
+    assert run_migrations(conn) == []
+
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO assignment_logs (user_id, subject_code, actual_hours_spent) VALUES (1, 'CSX', 2)")
+    # The same subject code may belong to two users
+    cursor.executemany("INSERT INTO subjects (user_id, subject_code) VALUES (%s, 'CSX')", [(1,), (2,)])
+    conn.commit()
+    assert rows(conn, "SELECT created_at IS NOT NULL FROM assignment_logs") == [(1,)]
+
+
+def test_pre_existing_database(conn):
+    # The schema from before accounts existed: no user_id, subjects keyed on code alone
+    cursor = conn.cursor()
+    m001_base_tables(cursor)
+    cursor.execute("INSERT INTO subjects (subject_code, subject_name, is_terror_prof) VALUES ('CSX', 'X', 1)")
+    cursor.executemany(
+        "INSERT INTO assignment_logs (subject_code, task_category, actual_hours_spent, final_grade_received) "
+        "VALUES (%s, %s, %s, %s)",
+        [("CSX", "Technical", 2.0, 3.0), ("CSX", "Technical", 4.0, None), ("CSX", "Essay", 1.0, 4.0)])
+    conn.commit()
+
+    assert run_migrations(conn) == ALL_VERSIONS
+    assert_current_schema(conn)
+
+    # Existing rows belong to user 1 and keep their data
+    assert rows(conn, "SELECT user_id, subject_code, subject_name, is_terror_prof FROM subjects") == \
+        [(1, "CSX", "X", 1)]
+    assert rows(conn, "SELECT DISTINCT user_id FROM assignment_logs") == [(1,)]
+    # Aggregates are backfilled from the history
+    assert rows(conn, "SELECT user_id, subject_code, grade_sum, grade_count, task_count, last_grade, last_task_id "
+                      "FROM subject_stats") == [(1, "CSX", 7.0, 2, 3, 4.0, 3)]
+    assert rows(conn, "SELECT task_category, task_count, hours_sum, grade_count, great_count "
+                      "FROM task_weekly_stats ORDER BY task_category") == \
+        [("Essay", 1, 1.0, 1, 1), ("Technical", 2, 6.0, 1, 0)]
+    assert rows(conn, "SELECT COUNT(*) FROM assignment_logs WHERE created_at IS NULL") == [(0,)]
+
+
+def test_interrupted_migrations_rerun_cleanly(conn):
+    run_migrations(conn)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO assignment_logs (user_id, subject_code, final_grade_received) VALUES (1, 'CSX', 3)")
+    conn.commit()
+
+    # Twice, so the second pass finds the first one's backfilled rows
+    for _ in range(2):
+        # As if the process died after m002-m006 changed the schema but before they were recorded
+        cursor.execute("DELETE FROM schema_migrations WHERE version >= 2")
+        conn.commit()
+        assert run_migrations(conn) == ALL_VERSIONS[1:]
+    assert_current_schema(conn)
+    # Backfills replace rather than add
+    assert rows(conn, "SELECT grade_sum, task_count FROM subject_stats") == [(3.0, 1)]
+    assert rows(conn, "SELECT task_count FROM task_weekly_stats") == [(1,)]
@@ -0,0 +1,43 @@
+"""PasswordHasher recovery when a worker process dies."""
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from auth import PasswordHasher, get_password_hash
+
+
+@pytest.fixture
+def hasher():
+    # One slot, so a leaked one would reject the next call with a 503
+    hasher = PasswordHasher(workers=1, max_queue=0, timeout=30)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_recovers_after_worker_dies(hasher):
+    hashed = get_password_hash("hunter2")
+    assert hasher.verify("hunter2", hashed)
+    broken = hasher._executor
+
+    with pytest.raises(HTTPException) as excinfo:
+        hasher._run(os._exit, 1)
+
+    assert excinfo.value.status_code == 503
+    assert hasher._executor is None and hasher.stats()["in_flight"] == 0
+    assert hasher.verify("hunter2", hashed)
+    assert hasher._executor is not broken
+    assert hasher.stats()["crashes"] == 1
+
+
+def test_recovers_after_worker_dies_async(hasher):
+    hashed = get_password_hash("hunter2")
+
+    async def run():
+        with pytest.raises(HTTPException):
+            await hasher._run_async(os._exit, 1)
+        return await hasher.verify_async("hunter2", hashed)
+
+    assert asyncio.run(run())
+    assert hasher.stats()["in_flight"] == 0 and hasher.stats()["crashes"] == 1
@@ -0,0 +1,34 @@
+"""RetrainScheduler debouncing."""
+import threading
+import time
+
+from scheduler import RetrainScheduler
+
+
+def test_steady_requests_still_run_by_max_delay():
+    ran = threading.Event()
+    scheduler = RetrainScheduler(ran.set, quiet_seconds=0.2, max_delay_seconds=0.5)
+    scheduler.start()
+    try:
+        started = time.monotonic()
+        # Each request lands inside the quiet window of the one before
+        while not ran.is_set() and time.monotonic() - started < 3:
+            scheduler.request_retrain()
+            time.sleep(0.05)
+        assert ran.is_set()
+        assert time.monotonic() - started < 1.0
+    finally:
+        scheduler.stop(timeout=1)
+
+
+def test_requests_within_quiet_window_merge():
+    runs = []
+    scheduler = RetrainScheduler(lambda: runs.append(time.monotonic()), quiet_seconds=0.1, max_delay_seconds=5)
+    scheduler.start()
+    try:
+        for _ in range(5):
+            scheduler.request_retrain()
+        time.sleep(0.4)
+        assert len(runs) == 1 and scheduler.status()["runs_completed"] == 1
+    finally:
+        scheduler.stop(timeout=1)
@@ -0,0 +1,54 @@
+"""load_training_frame on DB_BACKEND=sqlite."""
+import numpy as np
+
+from training_data import _numeric_chunk, load_training_frame
+
+BIG_IDS = [2 ** 24 + 1, 2 ** 24 + 3, 2 ** 31 - 1]
+
+
+def insert_tasks(storage, rows):
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO assignment_logs (task_id, user_id, subject_code, task_category, difficulty_rating, "
+            "days_started_before_deadline, actual_hours_spent, final_grade_received) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load(storage, **kwargs):
+    conn = storage.connect()
+    try:
+        return load_training_frame(conn, budget_mb=0, **kwargs)
+    finally:
+        conn.close()
+
+
+def test_ids_above_float32_precision(sqlite_storage):
+    insert_tasks(sqlite_storage, [(task_id, task_id, "CSX", "Technical", 3, 1, 2.5, 3.0) for task_id in BIG_IDS])
+
+    # One row per chunk, so every chunk goes through the conversion on its own
+    df, stats = load(sqlite_storage, chunk_rows=1)
+
+    assert stats["rows"] == 3 and stats["chunks"] == 3
+    assert df["task_id"].dtype == np.int32 and df["user_id"].dtype == np.int32
+    assert sorted(df["task_id"].tolist()) == BIG_IDS
+    assert sorted(df["user_id"].tolist()) == BIG_IDS
+
+
+def test_nulls_keep_large_ids_exact(sqlite_storage):
+    insert_tasks(sqlite_storage, [(BIG_IDS[0], BIG_IDS[0], "CSX", "Technical", None, 1, 2.5, 3.0)])
+
+    df, _ = load(sqlite_storage)
+
+    assert np.isnan(df["difficulty_rating"].iloc[0])
+    assert df["task_id"].tolist() == [BIG_IDS[0]]
+
+
+def test_numeric_chunk():
+    assert _numeric_chunk((2 ** 24 + 1, 5), 'int32').tolist() == [2 ** 24 + 1, 5]
+    with_null = _numeric_chunk((2 ** 31 - 1, None), 'int32')
+    assert with_null[0] == 2 ** 31 - 1 and np.isnan(with_null[1])
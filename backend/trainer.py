@@ -0,0 +1,43 @@
+"""
+Standalone model trainer for multi-worker deployments.
+
+Run next to `uvicorn main:app --workers N` started with TRAINER_MODE=external.
+This process holds the trainer lock, trains on the requests forwarded by the
+workers and publishes artifacts to ARTIFACT_DIR, which the workers hot-reload.
+A second copy waits on the lock and takes over if the first one exits.
+
+Usage (from backend/):
+    python trainer.py
+"""
+import signal
+import threading
+
+import main
+
+
+def run():
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    main.init_database()
+    print("Waiting for the trainer lock...")
+    main.trainer_lock.try_acquire(blocking=True)
+    print("Acquired the trainer lock")
+
+    main.become_trainer(main.load_latest_artifact())
+    main.model_registry.start()
+    main.model_watcher.start()
+    try:
+        stop.wait()
+    finally:
+        main.model_watcher.stop(timeout=5)
+        main.retrain_scheduler.stop(timeout=5)
+        main.model_registry.stop(timeout=5)
+        main.training_worker.shutdown()
+        main.trainer_lock.release()
+        main.db_pool.dispose()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,217 @@
+"""
+Model building: encoders, engineered features, hyperparameter tuning and fitting.
+
+Tuning results are cached in the models dict under 'tuning' (and therefore in
+saved artifacts). A retrain only reruns the full search when there is no
+cached result, the dataset has grown past TUNE_GROWTH_THRESHOLD since the
+last search, or the score with cached params drops by more than
+TUNE_SCORE_DROP. Otherwise it does a single fit with the cached params and
+takes its metrics from the forest's out-of-bag predictions (or a CV pass for
+backends without OOB scoring). Which estimator is fitted is configured per
+model in estimators.py. Searches and CV leave n_jobs to the caller's joblib
+configuration, which the training worker sets to its core budget (see
+training_worker.py).
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, cross_validate
+from sklearn.preprocessing import LabelEncoder
+
+from estimators import Backend, backend_for
+from features import ENGINEERED_FEATURES, add_engineered_features
+from ledger import phase
+from selection import MODEL_SELECTION, select_by_cost, selection_summary
+
+# "grid" (exhaustive) or "halving" (successive halving over samples)
+MODEL_SEARCH = os.getenv("MODEL_SEARCH", "grid")
+# Rerun the full search when the row count grows by this fraction
+TUNE_GROWTH_THRESHOLD = float(os.getenv("TUNE_GROWTH_THRESHOLD", "0.2"))
+# ...or when R² with cached params falls this far below the searched score
+TUNE_SCORE_DROP = float(os.getenv("TUNE_SCORE_DROP", "0.05"))
+
+MIN_ROWS_FOR_SEARCH = 20
+# Successive halving needs enough rows to make the early rounds meaningful
+MIN_ROWS_FOR_HALVING = 200
+
+DURATION_FEATURES = ['difficulty_rating', 'subject_code_encoded', 'task_category_encoded',
+                     'is_terror_prof', 'subject_cumulative_gpa', 'workload_last_7_days', 'assignment_sequence']
+GRADE_FEATURES = ['actual_hours_spent', 'days_started_before_deadline', 'task_category_encoded',
+                  'is_terror_prof', 'subject_cumulative_gpa', 'workload_last_7_days', 'assignment_sequence']
+
+# Model name -> (feature columns, target column, unit for logging)
+MODEL_TARGETS = {
+    'duration': (DURATION_FEATURES, 'actual_hours_spent', 'hours'),
+    'grade': (GRADE_FEATURES, 'final_grade_received', 'GPA points'),
+}
+
+CV_SCORING = {'r2': 'r2', 'mae': 'neg_mean_absolute_error'}
+
+
+def _search(name: str, estimator, X, y, param_grid: dict):
+    """Returns (fitted estimator, params, cost selection record or None)."""
+    # Cost-aware selection fits its own shortlist instead of refitting the top scorer
+    refit = MODEL_SELECTION != "cost"
+    if MODEL_SEARCH == "halving" and len(X) >= MIN_ROWS_FOR_HALVING:
+        search = HalvingGridSearchCV(estimator, param_grid, cv=3, scoring='r2', factor=3,
+                                     random_state=42, n_jobs=None, verbose=0, refit=refit)
+    else:
+        search = GridSearchCV(estimator, param_grid, cv=3, scoring='r2', n_jobs=None, verbose=0, refit=refit)
+    with phase(f'{name}_search'):
+        search.fit(X, y)
+    if refit:
+        return search.best_estimator_, search.best_params_, None
+    with phase(f'{name}_selection'):
+        return select_by_cost(estimator, search.cv_results_, X, y)
+
+
+def _cv_metrics(estimator, X, y) -> dict:
+    """R² and MAE from one K-fold pass (both scorers share the same fits)."""
+    n_folds = min(5, len(X))
+    scores = cross_validate(estimator, X, y, cv=n_folds, scoring=CV_SCORING, n_jobs=None)
+    return {'r2': float(scores['test_r2'].mean()), 'mae': float(-scores['test_mae'].mean()), 'source': 'cv'}
+
+
+def _oob_metrics(estimator, y) -> Optional[dict]:
+    pred = getattr(estimator, 'oob_prediction_', None)
+    if pred is None:
+        return None
+    pred = np.asarray(pred).ravel()
+    mask = np.isfinite(pred)
+    if mask.sum() < 2:
+        return None
+    y = np.asarray(y)[mask]
+    return {'r2': float(r2_score(y, pred[mask])), 'mae': float(mean_absolute_error(y, pred[mask])), 'source': 'oob'}
+
+
+def _fit_metrics(backend: Backend, estimator, make, X, y) -> Optional[dict]:
+    """Metrics of a fitted estimator: OOB when the backend has it, else a CV pass."""
+    if backend.oob:
+        return _oob_metrics(estimator, y)
+    return _cv_metrics(make(), X, y)
+
+
+def fit_model(name: str, X, y, cached: Optional[dict], backend: Optional[Backend] = None):
+    """
+    Fit one model, reusing cached params when they are still valid.
+    Returns (estimator, metrics or None, tuning record or None).
+    """
+    backend = backend or backend_for(name)
+    columns = list(X.columns)
+    cardinalities = {column: int(X[column].nunique()) for column in columns}
+
+    def make(**params):
+        return backend.make(columns, cardinalities, **params)
+
+    # Serving predicts on plain arrays, so fit on one too (forests use float32 internally)
+    X = X.to_numpy(dtype=np.float32)
+
+    n_rows = len(X)
+    if n_rows < MIN_ROWS_FOR_SEARCH:
+        # Not enough data for a search, use default params
+        estimator = make(**backend.default_params)
+        with phase(f'{name}_fit'):
+            estimator.fit(X, y)
+        print(f"Not enough data for GridSearchCV on {name} model")
+        return estimator, None, None
+
+    # Tuned params only carry over within the same backend and selection mode
+    if cached is not None and (cached.get('backend', 'random_forest') != backend.name
+                               or cached.get('selection', {}).get('mode', 'accuracy') != MODEL_SELECTION):
+        cached = None
+    grown = cached is not None and n_rows >= cached['rows'] * (1 + TUNE_GROWTH_THRESHOLD)
+    if cached is not None and not grown:
+        estimator = make(**cached['params'], oob_score=True)
+        with phase(f'{name}_fit'):
+            estimator.fit(X, y)
+        with phase(f'{name}_oob' if backend.oob else f'{name}_cv'):
+            metrics = _fit_metrics(backend, estimator, lambda: make(**cached['params']), X, y)
+        if metrics is not None and metrics['r2'] >= cached['r2'] - TUNE_SCORE_DROP:
+            print(f"Reused cached {name} params: {cached['params']}")
+            return estimator, metrics, cached
+        print(f"{name.capitalize()} score dropped with cached params, rerunning search")
+
+    print(f"Running {MODEL_SEARCH} search for {name.capitalize()} Model ({backend.name})...")
+    estimator, best_params, selection = _search(name, make(oob_score=True), X, y, backend.param_grids[name])
+    print(f"{'Selected' if selection else 'Best'} {name.capitalize()} Params: {best_params}")
+    if selection:
+        print(f"{name.capitalize()} model {selection_summary(selection)}")
+    with phase(f'{name}_cv'):
+        metrics = _cv_metrics(estimator, X, y)
+    # Baseline for drift checks uses the same metric as the cached path
+    baseline = _oob_metrics(estimator, y) if backend.oob else None
+    tuning = {
+        'params': best_params,
+        'rows': n_rows,
+        'r2': baseline['r2'] if baseline else metrics['r2'],
+        'search': MODEL_SEARCH,
+        'backend': backend.name,
+    }
+    if selection:
+        tuning['selection'] = selection
+    return estimator, metrics, tuning
+
+
+def _fit_encoder(encoder: LabelEncoder, column: pd.Series) -> np.ndarray:
+    """LabelEncoder.fit_transform, reusing the codes of a categorical column when it has them."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and not column.isna().any():
+        column = column.cat.remove_unused_categories()
+        # Same sorted classes_ fit() would find, without materialising the strings
+        encoder.classes_ = np.asarray(column.cat.categories, dtype=object)
+        return column.cat.codes.to_numpy(dtype=np.int32)
+    return encoder.fit_transform(column)
+
+
+def prepare_features(df: pd.DataFrame, models: dict) -> pd.DataFrame:
+    """Fit the encoders into `models` and add encoded and engineered columns to the frame."""
+    # Encoders
+    with phase('encoding'):
+        le_subject = LabelEncoder()
+        df['subject_code_encoded'] = _fit_encoder(le_subject, df['subject_code'])
+
+        le_category = LabelEncoder()
+        df['task_category_encoded'] = _fit_encoder(le_category, df['task_category'])
+
+    models['le_subject'] = le_subject
+    models['le_category'] = le_category
+
+    df['is_terror_prof'] = df['is_terror_prof'].fillna(0).astype(np.int8)
+
+    # === FEATURE ENGINEERING ===
+    # Sorted by task_id; adds subject_cumulative_gpa, workload_last_7_days
+    # and assignment_sequence (see features.py)
+    df = add_engineered_features(df)
+    # The forests cast X to float32 anyway, so storing features narrower loses nothing
+    for column in ENGINEERED_FEATURES:
+        df[column] = df[column].astype(np.float32)
+    return df
+
+
+def build_models(df: pd.DataFrame, previous_tuning: Optional[dict] = None) -> dict:
+    """Encode, engineer features and fit both models. Returns a new models dict."""
+    previous_tuning = previous_tuning or {}
+    models = {}
+    df = prepare_features(df, models)
+
+    tuning = {}
+    for name, (columns, target, unit) in MODEL_TARGETS.items():
+        backend = backend_for(name)
+        estimator, metrics, record = fit_model(name, df[columns], df[target], previous_tuning.get(name), backend)
+        models[f'{name}_model'] = estimator
+        models[f'{name}_backend'] = backend.name
+        models[f'{name}_r2'] = metrics['r2'] if metrics else None
+        models[f'{name}_mae'] = metrics['mae'] if metrics else None
+        models[f'{name}_metric_source'] = metrics['source'] if metrics else None
+        if metrics:
+            print(f"{name.capitalize()} Model - R² ({metrics['source'].upper()}): {metrics['r2']:.3f}, "
+                  f"MAE: {metrics['mae']:.3f} {unit}")
+        if record:
+            tuning[name] = record
+
+    models['tuning'] = tuning
+    models['training_rows'] = len(df)
+    return models
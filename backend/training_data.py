@@ -0,0 +1,164 @@
+"""
+Memory-lean loading of the training frame.
+
+Only the columns the models use are selected, and rows are streamed from an
+unbuffered cursor in chunks of TRAINING_CHUNK_ROWS, each converted straight
+to compact numpy arrays (int32 / int16 / int8, with subject and category as
+categoricals). No intermediate object-dtype frame of the whole history is
+ever built. Hours and grades stay float64: they are the targets and feed the
+running sums behind the engineered features, so narrowing them would change
+the fitted models.
+
+With TRAINING_MEMORY_BUDGET_MB set, the loader estimates the per-row cost of
+the frame plus the model-fitting copies and, if the full history would not
+fit, trains on the newest rows that do (reported as `truncated`).
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+TRAINING_CHUNK_ROWS = int(os.getenv("TRAINING_CHUNK_ROWS", "10000"))
+# 0 disables the budget
+TRAINING_MEMORY_BUDGET_MB = float(os.getenv("TRAINING_MEMORY_BUDGET_MB", "0"))
+
+# Column -> (SQL expression, dtype); 'category' columns are built from codes
+TRAINING_COLUMNS: Dict[str, Tuple[str, str]] = {
+    'task_id': ('a.task_id', 'int32'),
+    # Engineered features are per user (see features.py)
+    'user_id': ('a.user_id', 'int32'),
+    'subject_code': ('a.subject_code', 'category'),
+    'task_category': ('a.task_category', 'category'),
+    'difficulty_rating': ('a.difficulty_rating', 'int16'),
+    'days_started_before_deadline': ('a.days_started_before_deadline', 'int16'),
+    'actual_hours_spent': ('a.actual_hours_spent', 'float64'),
+    'final_grade_received': ('a.final_grade_received', 'float64'),
+    'is_terror_prof': ('COALESCE(s.is_terror_prof, 0)', 'int8'),
+}
+
+# Bytes per row added by build_models on top of the loaded columns: two int32
+# encodings, three float32 engineered features, and per model a float32 X
+# (7 features) plus a float64 y, which the forest makes internally
+BUILD_BYTES_PER_ROW = 2 * 4 + 3 * 4 + 2 * (7 * 4 + 8)
+
+
+def bytes_per_row() -> int:
+    """Estimated peak bytes per training row, frame and fitting copies included."""
+    loaded = sum(4 if dtype == 'category' else np.dtype(dtype).itemsize for _, dtype in TRAINING_COLUMNS.values())
+    return loaded + BUILD_BYTES_PER_ROW
+
+
+def _where(user_id: Optional[int], min_task_id: Optional[int]) -> Tuple[str, tuple]:
+    clauses, params = [], ()
+    if user_id is not None:
+        clauses.append("a.user_id = %s")
+        params += (user_id,)
+    if min_task_id is not None:
+        clauses.append("a.task_id >= %s")
+        params += (min_task_id,)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _budget_cutoff(conn, user_id: Optional[int], max_rows: int) -> Optional[int]:
+    """Smallest task_id to load so at most max_rows (the newest) are read, or None for all."""
+    cursor = conn.cursor()
+    where, params = _where(user_id, None)
+    cursor.execute(f"SELECT COUNT(*) FROM assignment_logs a {where}", params)
+    if cursor.fetchone()[0] <= max_rows:
+        return None
+    cursor.execute(f"SELECT a.task_id FROM assignment_logs a {where} ORDER BY a.task_id DESC LIMIT 1 OFFSET %s",
+                   params + (max_rows - 1,))
+    return cursor.fetchone()[0]
+
+
+class _CategoryBuilder:
+    """Accumulates integer codes across chunks; categories are sorted at the end."""
+
+    def __init__(self):
+        self.lookup: Dict[str, int] = {}
+        self.chunks: List[np.ndarray] = []
+
+    def add(self, values: tuple):
+        lookup = self.lookup
+        codes = np.fromiter(
+            (-1 if v is None else lookup.setdefault(v, len(lookup)) for v in values),
+            dtype=np.int32, count=len(values))
+        self.chunks.append(codes)
+
+    def build(self) -> pd.Categorical:
+        codes = np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.int32)
+        names = np.array(list(self.lookup), dtype=object)
+        order = np.argsort(names, kind='stable')
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+        if len(remap):
+            codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+        return pd.Categorical.from_codes(codes, categories=names[order])
+
+
+def _numeric_chunk(values: tuple, dtype: str) -> np.ndarray:
+    # None becomes NaN; integer columns fall back to float64 (exact for any
+    # int32 id) only for chunks that contain NULLs
+    if dtype.startswith('float'):
+        return np.array(values, dtype=dtype)
+    if None in values:
+        return np.array(values, dtype=np.float64)
+    return np.array(values, dtype=dtype)
+
+
+def load_training_frame(conn, user_id: Optional[int] = None, budget_mb: Optional[float] = None,
+                        chunk_rows: int = TRAINING_CHUNK_ROWS) -> Tuple[pd.DataFrame, dict]:
+    """
+    Task rows joined with their owner's subject settings, optionally for one
+    user, in compact dtypes. Returns (frame, load stats).
+    """
+    budget_mb = TRAINING_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+    min_task_id = None
+    if budget_mb and budget_mb > 0:
+        max_rows = max(1, int(budget_mb * 1024 * 1024 // bytes_per_row()))
+        min_task_id = _budget_cutoff(conn, user_id, max_rows)
+
+    where, params = _where(user_id, min_task_id)
+    select = ", ".join(f"{expr} AS {name}" for name, (expr, _) in TRAINING_COLUMNS.items())
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {select}
+        FROM assignment_logs a
+        LEFT JOIN subjects s ON a.subject_code = s.subject_code AND s.user_id = a.user_id
+        {where}
+    """, params)
+
+    names = list(TRAINING_COLUMNS)
+    numeric: Dict[str, List[np.ndarray]] = {n: [] for n, (_, d) in TRAINING_COLUMNS.items() if d != 'category'}
+    categories = {n: _CategoryBuilder() for n, (_, d) in TRAINING_COLUMNS.items() if d == 'category'}
+    rows = chunks = 0
+    while True:
+        batch = cursor.fetchmany(chunk_rows)
+        if not batch:
+            break
+        for name, values in zip(names, zip(*batch)):
+            if name in categories:
+                categories[name].add(values)
+            else:
+                numeric[name].append(_numeric_chunk(values, TRAINING_COLUMNS[name][1]))
+        rows += len(batch)
+        chunks += 1
+
+    columns = {}
+    for name, (_, dtype) in TRAINING_COLUMNS.items():
+        if name in categories:
+            columns[name] = categories[name].build()
+        elif numeric[name]:
+            columns[name] = np.concatenate(numeric[name])
+        else:
+            columns[name] = np.zeros(0, dtype=dtype)
+    df = pd.DataFrame(columns)
+    stats = {
+        "rows": rows,
+        "chunks": chunks,
+        "frame_mb": round(float(df.memory_usage(deep=True).sum()) / (1024 * 1024), 2),
+        "budget_mb": budget_mb or None,
+        "truncated": min_task_id is not None,
+    }
+    return df, stats
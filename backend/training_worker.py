@@ -0,0 +1,155 @@
+"""
+Model fitting out of the serving process.
+
+Grid searches, cross-validation and forests fit with joblib across every core
+they are allowed, and fitting on a thread of the serving process used to take
+those cores from /predict and /tasks for as long as a retrain ran.
+With TRAINING_ISOLATION=process (the default) every fit runs in one spawned
+worker process instead. That process:
+
+    - is pinned to TRAINING_CPUS cores (the highest-numbered ones the server
+      may use, leaving the low ones to request handling) where the OS
+      supports affinity, and otherwise just limited to that many threads
+    - runs at TRAINING_NICE, so the kernel prefers serving threads when both
+      want a core
+    - caps joblib, BLAS and OpenMP thread pools at TRAINING_CPUS; the limits
+      are also exported to the environment for joblib's own worker processes
+
+The worker reads the training frame from the database itself (the frame
+never crosses the process boundary) and sends back the fitted models dict,
+the ledger phases it timed and its SQL time. Fits queue behind each other on
+the single worker. TRAINING_ISOLATION=thread fits in the calling thread,
+still within the joblib budget, for debugging and platforms without spawn.
+
+Serving evaluates one request per thread, so `limit_serving_threads()` caps
+BLAS/OpenMP at one thread in the serving process once fitting has moved out.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+# "process" (separate worker) or "thread" (in the calling thread)
+TRAINING_ISOLATION = os.getenv("TRAINING_ISOLATION", "process")
+TRAINING_CPUS = int(os.getenv("TRAINING_CPUS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Added to the worker's niceness (0-19); 0 leaves it at the server's priority
+TRAINING_NICE = int(os.getenv("TRAINING_NICE", "10"))
+
+# Thread pool sizes read by OpenMP, the BLAS builds numpy/scipy ship with, and numexpr
+THREAD_LIMIT_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                     'BLIS_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+
+def training_cores(cpus: int) -> Optional[set]:
+    """The cores a training process should be pinned to, or None to leave affinity alone."""
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    available = sorted(os.sched_getaffinity(0))
+    if cpus >= len(available):
+        return None
+    return set(available[-cpus:])
+
+
+def _init_worker(cpus: int, nice: int):
+    for name in THREAD_LIMIT_VARS:
+        os.environ[name] = str(cpus)
+    cores = training_cores(cpus)
+    if cores is not None:
+        os.sched_setaffinity(0, cores)
+    if nice > 0 and hasattr(os, 'nice'):
+        os.nice(nice)
+    # Libraries already loaded (numpy via the parent's main module) don't reread the environment
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=cpus)
+
+
+def fit(storage, user_id: Optional[int], previous_tuning: Optional[dict], min_rows: int, cpus: int) -> dict:
+    """
+    Load the training frame through `storage` and fit models on it. Returns
+    {'rows', 'models' (None below min_rows), 'phases', 'sql_seconds'}.
+    """
+    # Imported here so a fresh worker applies its thread limits before numpy and sklearn load
+    from joblib import parallel_config
+
+    from ledger import TrainingRun, collecting, phase
+    from memory import PeakMemory
+    from training import build_models
+    from training_data import load_training_frame
+
+    run = TrainingRun("worker")
+    models = None
+    with collecting(run), PeakMemory() as memory:
+        conn = storage.connect()
+        try:
+            started = time.perf_counter()
+            with phase('sql_load'):
+                df, load_stats = load_training_frame(conn, user_id)
+            sql_seconds = time.perf_counter() - started
+        finally:
+            conn.close()
+        rows = len(df)
+        if rows >= min_rows:
+            with parallel_config(n_jobs=cpus):
+                models = build_models(df, previous_tuning=previous_tuning)
+        del df
+    if models is not None:
+        models['training_data'] = {**load_stats, 'memory': memory.report()}
+    return {'rows': rows, 'models': models, 'phases': run.record['phases'], 'sql_seconds': sql_seconds}
+
+
+class TrainingWorker:
+    """Runs `fit()` in a dedicated low-priority process, or inline with mode='thread'."""
+
+    def __init__(self, mode: str = TRAINING_ISOLATION, cpus: int = TRAINING_CPUS, nice: int = TRAINING_NICE):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown TRAINING_ISOLATION {mode!r} (expected process or thread)")
+        self.mode = mode
+        self.cpus = max(1, cpus)
+        self.nice = nice
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.fits = 0
+        self.crashes = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded server process is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_init_worker, initargs=(self.cpus, self.nice))
+            return self._executor
+
+    def fit(self, storage, user_id: Optional[int], previous_tuning: Optional[dict], min_rows: int) -> dict:
+        with self._lock:
+            self.fits += 1
+        if self.mode == "thread":
+            return fit(storage, user_id, previous_tuning, min_rows, self.cpus)
+        executor = self._pool()
+        try:
+            return executor.submit(fit, storage, user_id, previous_tuning, min_rows, self.cpus).result()
+        except BrokenProcessPool:
+            # Killed mid-fit (out of memory, most likely); the next fit starts a new worker
+            with self._lock:
+                self.crashes += 1
+                if self._executor is executor:
+                    self._executor = None
+            raise RuntimeError("Training worker process exited during the fit")
+
+    def stats(self) -> dict:
+        return {'mode': self.mode, 'cpus': self.cpus, 'nice': self.nice,
+                'cores': sorted(training_cores(self.cpus) or []), 'fits': self.fits, 'crashes': self.crashes}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def limit_serving_threads():
+    """Cap BLAS/OpenMP at one thread for the libraries loaded in this process."""
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=1)
@@ -1,5 +1,7 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
 import { Trophy, Target, Clock, BookOpen } from 'lucide-react';
+import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer } from 'recharts';
+import { fetchDashboardSummary } from '../services/api';
 
 const StatCard = ({ icon: Icon, label, value, color }) => (
     <div className="bg-surface border border-zinc-800 p-6 rounded-xl flex items-center gap-4">
@@ -13,7 +15,35 @@ const StatCard = ({ icon: Icon, label, value, color }) => (
     </div>
 );
 
+const ChartCard = ({ title, data, dataKey, nameKey }) => (
+    <div className="bg-surface border border-zinc-800 rounded-xl p-6 h-64 flex flex-col">
+        <p className="text-zinc-400 text-sm font-medium mb-4">{title}</p>
+        {data.length > 0 ? (
+            <ResponsiveContainer width="100%" height="100%">
+                <BarChart data={data}>
+                    <XAxis dataKey={nameKey} stroke="#71717a" fontSize={12} />
+                    <YAxis stroke="#71717a" fontSize={12} />
+                    <Tooltip contentStyle={{ background: '#18181b', border: '1px solid #27272a' }} />
+                    <Bar dataKey={dataKey} fill="#8b5cf6" radius={[4, 4, 0, 0]} />
+                </BarChart>
+            </ResponsiveContainer>
+        ) : (
+            <div className="flex-1 flex items-center justify-center text-zinc-500">No tasks logged yet</div>
+        )}
+    </div>
+);
+
 const Dashboard = () => {
+    const [summary, setSummary] = useState(null);
+
+    useEffect(() => {
+        fetchDashboardSummary()
+            .then(setSummary)
+            .catch((err) => console.error("Failed to load dashboard", err));
+    }, []);
+
+    const totals = summary?.totals;
+
     return (
         <div className="p-8 max-w-7xl mx-auto">
             <header className="mb-8">
@@ -22,19 +52,17 @@ const Dashboard = () => {
             </header>
 
             <div className="grid grid-cols-1 md:grid-cols-4 gap-6 mb-8">
-                <StatCard icon={Trophy} label="Great Grades" value="4" color="bg-green-500" />
-                <StatCard icon={Target} label="Tasks Logged" value="12" color="bg-blue-500" />
-                <StatCard icon={Clock} label="Study Hours" value="45.5" color="bg-purple-500" />
-                <StatCard icon={BookOpen} label="Courses" value="5" color="bg-orange-500" />
+                <StatCard icon={Trophy} label="Great Grades" value={totals ? totals.great_grades : '–'} color="bg-green-500" />
+                <StatCard icon={Target} label="Tasks Logged" value={totals ? totals.tasks : '–'} color="bg-blue-500" />
+                <StatCard icon={Clock} label="Study Hours" value={totals ? totals.hours : '–'} color="bg-purple-500" />
+                <StatCard icon={BookOpen} label="Courses" value={totals ? totals.subjects : '–'} color="bg-orange-500" />
             </div>
 
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-8">
-                <div className="bg-surface border border-zinc-800 rounded-xl p-6 h-64 flex items-center justify-center text-zinc-500">
-                    Chart Placeholder (Integrate Recharts here for history)
-                </div>
-                <div className="bg-surface border border-zinc-800 rounded-xl p-6 h-64 flex items-center justify-center text-zinc-500">
-                    Category Distribution Placeholder
-                </div>
+                <ChartCard title="Weekly Workload (hours)" data={summary?.weekly_workload ?? []}
+                    dataKey="hours" nameKey="week_start" />
+                <ChartCard title="Hours by Category" data={summary?.hours_by_category ?? []}
+                    dataKey="hours" nameKey="task_category" />
             </div>
         </div>
     );
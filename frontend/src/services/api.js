@@ -14,11 +14,17 @@ api.interceptors.request.use((config) => {
 });
 
 // Tasks
-export const fetchTasks = async () => {
-    const response = await api.get('/tasks');
+export const fetchTasks = async (params = {}) => {
+    const response = await api.get('/tasks', { params });
     return response.data;
 };
 
+// Keyset pagination: returns the page plus the cursor for the next (older) page
+export const fetchTasksPage = async ({ limit = 50, beforeId, fields } = {}) => {
+    const response = await api.get('/tasks', { params: { limit, before_id: beforeId, fields } });
+    return { tasks: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
 export const createTask = async (taskData) => {
     const response = await api.post('/tasks', taskData);
     return response.data;
@@ -30,6 +36,11 @@ export const predictOutcome = async (predictionInput) => {
     return response.data;
 };
 
+export const predictBatch = async (predictionInputs) => {
+    const response = await api.post('/predict/batch', { items: predictionInputs });
+    return response.data;
+};
+
 // Subjects
 export const fetchSubjects = async () => {
     const response = await api.get('/subjects');
@@ -41,4 +52,10 @@ export const updateSubject = async (subjectData) => {
     return response.data;
 };
 
+// Dashboard
+export const fetchDashboardSummary = async () => {
+    const response = await api.get('/dashboard/summary');
+    return response.data;
+};
+
 export default api;